@@ -0,0 +1,91 @@
+"""Measure per-run logging overhead: direct file handler vs. queue listener.
+
+Simulates a scrape run where WORKERS threads each process URLS_PER_WORKER
+URLs and emit the log records process_product/get_page emit per URL
+(INFO and DEBUG, with DEBUG filtered out at the default INFO level).
+
+``--disk-latency-us`` adds a sleep to every file write to mimic a slow or
+network-backed disk, where the synchronous handler serializes workers.
+
+Usage:
+	python benchmarks/bench_logging.py [--urls 2000] [--workers 4] [--disk-latency-us 0]
+"""
+import argparse
+import logging
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from scraper.logging_setup import setup_logging, shutdown_logging, correlation_scope
+
+logger = logging.getLogger('bench')
+
+
+def _worker_eager(urls: int, worker: int):
+	for i in range(urls):
+		url = f'https://www.amazon.com/dp/B{worker:02d}{i:06d}'
+		logger.info(f"Processing product: {url}")
+		logger.debug(f"Waiting {0.5:.2f} seconds before request")
+		logger.info(f"Fetching URL: {url}")
+		logger.debug(f"Successfully fetched {url} (Status: {200})")
+		logger.info(f"Updated product: {'Title'} - ${19.99:.2f}")
+
+
+def _worker_lazy(urls: int, worker: int):
+	for i in range(urls):
+		url = f'https://www.amazon.com/dp/B{worker:02d}{i:06d}'
+		with correlation_scope():
+			logger.info("Processing product: %s", url)
+			logger.debug("Waiting %.2f seconds before request", 0.5)
+			logger.info("Fetching URL: %s", url)
+			logger.debug("Successfully fetched %s (Status: %s)", url, 200)
+			logger.info("Updated product: %s - $%.2f", 'Title', 19.99)
+
+
+def _run(target, urls: int, workers: int) -> float:
+	threads = [threading.Thread(target=target, args=(urls, w)) for w in range(workers)]
+	started = time.perf_counter()
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	# Time seen by the workers; the queue drains afterwards off the hot path
+	elapsed = time.perf_counter() - started
+	shutdown_logging()
+	return elapsed
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('--urls', type=int, default=2000, help='URLs per worker')
+	parser.add_argument('--workers', type=int, default=4)
+	parser.add_argument('--disk-latency-us', type=float, default=0.0, help='Extra time per file write')
+	args = parser.parse_args()
+	records = args.urls * args.workers * 3
+
+	with tempfile.TemporaryDirectory() as tmp:
+		cases = [
+			('sync file handler, f-strings', _worker_eager, dict(use_queue=False, log_format='text')),
+			('queue listener, %-style', _worker_lazy, dict(use_queue=True, log_format='text')),
+			('queue listener, JSON lines', _worker_lazy, dict(use_queue=True, log_format='json')),
+		]
+		if args.disk_latency_us:
+			emit = logging.FileHandler.emit
+			
+			def slow_emit(handler, record):
+				time.sleep(args.disk_latency_us / 1e6)
+				emit(handler, record)
+			
+			logging.FileHandler.emit = slow_emit
+		
+		for name, target, options in cases:
+			setup_logging('INFO', str(Path(tmp) / f'{target.__name__}.log'), force=True, **options)
+			elapsed = _run(target, args.urls, args.workers)
+			print(f"{name:32s} {elapsed:7.3f}s  {elapsed / records * 1e6:6.1f} us/record")
+
+
+if __name__ == '__main__':
+	main()
@@ -5,7 +5,7 @@ from dotenv import load_dotenv
 load_dotenv(Path(__file__).parent / '.env')
 
 import os
-from typing import Optional
+from typing import Optional, Dict
 
 # Database
 DATABASE_URL: str = os.getenv('DATABASE_URL', 'sqlite:///data.db')
@@ -24,14 +24,70 @@ REQUEST_RETRIES: int = int(os.getenv('REQUEST_RETRIES', '5'))
 REQUEST_DELAY: float = float(os.getenv('REQUEST_DELAY', '1.0'))
 REQUEST_BACKOFF_FACTOR: float = float(os.getenv('REQUEST_BACKOFF_FACTOR', '1.0'))
 
+# Streaming fetch (stop downloading once the product fields have been seen)
+FETCH_STREAM: bool = os.getenv('FETCH_STREAM', 'false').lower() == 'true'
+FETCH_STREAM_MAX_BYTES: int = int(os.getenv('FETCH_STREAM_MAX_BYTES', '2000000'))
+FETCH_STREAM_CHUNK_SIZE: int = int(os.getenv('FETCH_STREAM_CHUNK_SIZE', '16384'))
+
+# Hedged requests: duplicate a request via another proxy once it is slower than
+# the HEDGE_PERCENTILE latency seen so far, for at most HEDGE_BUDGET of requests
+HEDGE_REQUESTS: bool = os.getenv('HEDGE_REQUESTS', 'false').lower() == 'true'
+HEDGE_PERCENTILE: float = float(os.getenv('HEDGE_PERCENTILE', '95'))
+HEDGE_BUDGET: float = float(os.getenv('HEDGE_BUDGET', '0.1'))
+HEDGE_MIN_SAMPLES: int = int(os.getenv('HEDGE_MIN_SAMPLES', '20'))
+HEDGE_MAX_WORKERS: int = int(os.getenv('HEDGE_MAX_WORKERS', '8'))
+
+# Captcha/robot-check handling: blocked URLs are requeued via a different proxy
+BLOCK_MAX_REQUEUES: int = int(os.getenv('BLOCK_MAX_REQUEUES', '2'))
+BLOCK_BACKOFF: float = float(os.getenv('BLOCK_BACKOFF', '5.0'))
+
+# Run deadline and global retry budget. A run stops starting new URLs (and
+# retries) RUN_DEADLINE_MARGIN seconds before its deadline so it can still
+# commit and export, but never reserves more than RUN_DEADLINE_MARGIN_FRACTION
+# of the run's window (short serve intervals). Empty = no limit.
+RUN_MAX_DURATION: Optional[float] = float(os.getenv('RUN_MAX_DURATION')) if os.getenv('RUN_MAX_DURATION') else None
+RUN_DEADLINE_MARGIN: float = float(os.getenv('RUN_DEADLINE_MARGIN', '60'))
+RUN_DEADLINE_MARGIN_FRACTION: float = float(os.getenv('RUN_DEADLINE_MARGIN_FRACTION', '0.25'))
+RETRY_BUDGET: Optional[int] = int(os.getenv('RETRY_BUDGET')) if os.getenv('RETRY_BUDGET') else None
+
+# Daemon mode (`main.py serve`): cycle every SERVE_INTERVAL seconds, or on SERVE_CRON if set
+SERVE_INTERVAL: float = float(os.getenv('SERVE_INTERVAL', '86400'))
+SERVE_CRON: Optional[str] = os.getenv('SERVE_CRON') or None
+
 # Amazon-specific
 AMAZON_DOMAIN: str = os.getenv('AMAZON_DOMAIN', 'www.amazon.com')
 USER_AGENT: str = os.getenv('USER_AGENT',
                             'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
 
+# Multi-marketplace: each product URL's own domain is used. Marketplaces are
+# scraped in parallel (up to MARKETPLACE_MAX_WORKERS), each with its own
+# session. Per-domain delays, e.g. 'www.amazon.de=2.0,amazon.co.jp=1.5'
+MARKETPLACE_MAX_WORKERS: int = int(os.getenv('MARKETPLACE_MAX_WORKERS', '4'))
+MARKETPLACE_REQUEST_DELAYS: Dict[str, float] = {
+	domain.strip().lower(): float(delay)
+	for domain, delay in (
+		item.split('=', 1) for item in os.getenv('MARKETPLACE_REQUEST_DELAYS', '').split(',') if '=' in item
+	)
+}
+
+# Time-partitioned price history (`main.py archive`): months before the last
+# HISTORY_HOT_MONTHS are moved out of the main database into one SQLite file per
+# month in ARCHIVE_DIR (default: <database name>_archive/ next to the database)
+HISTORY_HOT_MONTHS: int = int(os.getenv('HISTORY_HOT_MONTHS', '3'))
+ARCHIVE_DIR: Optional[str] = os.getenv('ARCHIVE_DIR') or None
+
+# Read-only query service (`main.py query`)
+QUERY_HOST: str = os.getenv('QUERY_HOST', '127.0.0.1')
+QUERY_PORT: int = int(os.getenv('QUERY_PORT', '8080'))
+QUERY_POOL_SIZE: int = int(os.getenv('QUERY_POOL_SIZE', '4'))
+QUERY_CACHE_SIZE: int = int(os.getenv('QUERY_CACHE_SIZE', '256'))
+QUERY_CACHE_TTL: float = float(os.getenv('QUERY_CACHE_TTL', '300'))
+
 # Logging
 LOG_LEVEL: str = os.getenv('LOG_LEVEL', 'INFO').upper()
 LOG_FILE: str = os.getenv('LOG_FILE', 'logs/amazon_scraper.log')
+LOG_FORMAT: str = os.getenv('LOG_FORMAT', 'text').lower()  # 'text' or 'json' (JSON lines)
+LOG_QUEUE: bool = os.getenv('LOG_QUEUE', 'true').lower() == 'true'
 
 # Ensure directories exist
 
@@ -1,23 +1,90 @@
 import argparse
 from runners.run_once import run_once
 from runners.run_daily import run_daily
+from runners.run_serve import serve
+from scraper.budget import parse_deadline
+from scraper.database import Database, RESOLUTIONS
+from reports.exporter import export_price_history_to_csv
+from reports.query_service import serve_queries
+from config import QUERY_HOST, QUERY_PORT, HISTORY_HOT_MONTHS
 
 
 def main():
 	parser = argparse.ArgumentParser(description='Amazon scraper runner')
 	sub = parser.add_subparsers(dest='command')
 	sub.required = False
-	sub.add_parser('once', help='Run scraping once')
-	sub.add_parser('daily', help='Run scrape then export CSV')
+	once_parser = sub.add_parser('once', help='Run scraping once')
+	daily_parser = sub.add_parser('daily', help='Run scrape then export CSV')
+	for run_parser in (once_parser, daily_parser):
+		run_parser.add_argument(
+			'--deadline', type=parse_deadline,
+			help='Finish by this time: HH:MM (next occurrence) or an ISO datetime'
+		)
+		run_parser.add_argument('--max-duration', type=float, help='Seconds the run may take')
+	serve_parser = sub.add_parser('serve', help='Run as a daemon with an in-process scheduler')
+	schedule_group = serve_parser.add_mutually_exclusive_group()
+	schedule_group.add_argument('--interval', type=float, help='Seconds between scrape cycles')
+	schedule_group.add_argument('--cron', help='Cron expression, e.g. "0 9 * * *"')
+	renormalize_parser = sub.add_parser('renormalize', help='Recompute stored prices from their raw price text')
+	renormalize_parser.add_argument('--marketplace', help='Only rows from this domain, e.g. www.amazon.de')
+	history_parser = sub.add_parser('history', help='Export price history to CSV')
+	history_parser.add_argument(
+		'--resolution', choices=RESOLUTIONS, default='daily',
+		help='raw points or a daily/weekly/monthly rollup (default: daily)'
+	)
+	history_parser.add_argument('--product-id', type=int, help='Only this product')
+	history_parser.add_argument('--start', help='Only history from this ISO date on, e.g. 2025-01-01')
+	history_parser.add_argument('--end', help='Only history before this ISO date')
+	archive_parser = sub.add_parser('archive', help='Move cold price history months to per-month archive files')
+	archive_parser.add_argument(
+		'--hot-months', type=int, default=HISTORY_HOT_MONTHS,
+		help=f'Months kept in the main database, counting the current one (default: {HISTORY_HOT_MONTHS})'
+	)
+	query_parser = sub.add_parser('query', help='Serve read-only price queries over HTTP/JSON')
+	query_parser.add_argument('--host', default=QUERY_HOST, help=f'Bind address (default: {QUERY_HOST})')
+	query_parser.add_argument('--port', type=int, default=QUERY_PORT, help=f'Port (default: {QUERY_PORT})')
 	args = parser.parse_args()
 	cmd = args.command or 'once'
 	
-	if cmd == 'daily':
+	if cmd == 'query':
+		serve_queries(args.host, args.port)
+	elif cmd == 'history':
+		print(f"==> Exporting {args.resolution} price history")
+		db = Database()
+		try:
+			filename = export_price_history_to_csv(
+				db, args.resolution, product_id=args.product_id, start=args.start, end=args.end
+			)
+		finally:
+			db.close()
+		print(f"Exported to: {filename}")
+	elif cmd == 'archive':
+		print("==> Archiving cold price history")
+		db = Database()
+		try:
+			moved = db.archive_price_history(args.hot_months)
+		finally:
+			db.close()
+		for month, rows in moved.items():
+			print(f"{month}: {rows} rows")
+		print(f"Archived {sum(moved.values())} rows from {len(moved)} months to: {db.archive_dir}")
+	elif cmd == 'renormalize':
+		print("==> Re-normalizing stored prices")
+		db = Database()
+		try:
+			updated = db.renormalize_prices(marketplace=args.marketplace)
+		finally:
+			db.close()
+		print(f"Updated {updated} price history rows")
+	elif cmd == 'serve':
+		print("==> Running serve daemon")
+		serve(interval=args.interval, cron=args.cron)
+	elif cmd == 'daily':
 		print("==> Running daily workflow")
-		run_daily()
+		run_daily(deadline=args.deadline, max_duration=args.max_duration)
 	else:
 		print("==> Running once")
-		run_once()
+		run_once(deadline=getattr(args, 'deadline', None), max_duration=getattr(args, 'max_duration', None))
 
 
 if __name__ == '__main__':
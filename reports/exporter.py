@@ -8,17 +8,32 @@ from typing import List, Dict, Any, Union, Optional, Tuple
 import sys
 
 sys.path.append(str(Path(__file__).parent.parent))
-from config import REPORTS_DIR, LOG_LEVEL, LOG_FILE
+from config import REPORTS_DIR
 
 # Set up logging
-logging.basicConfig(
-	level=getattr(logging, LOG_LEVEL, logging.INFO),
-	format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-	filename=LOG_FILE if LOG_FILE else None
-)
+from scraper.logging_setup import setup_logging
+
+setup_logging()
 logger = logging.getLogger(__name__)
 
 
+def _timestamped_path(output_dir: Optional[Union[str, Path]], prefix: str) -> Path:
+	"""Resolve (and create) the output directory and return a timestamped CSV path."""
+	# Determine output directory
+	output_dir = Path(output_dir or REPORTS_DIR)
+	
+	# Resolve relative paths relative to project root if needed
+	if not output_dir.is_absolute():
+		output_dir = Path(__file__).resolve().parent.parent / output_dir
+	
+	# Ensure the directory exists
+	output_dir.mkdir(parents=True, exist_ok=True)
+	
+	# Generate filename with timestamp
+	timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+	return output_dir / f'{prefix}_{timestamp}.csv'
+
+
 def export_prices_to_csv(
 		rows: List[Tuple[Any, ...]],
 		output_dir: Optional[Union[str, Path]] = None
@@ -41,19 +56,7 @@ def export_prices_to_csv(
 		logger.warning("No data rows provided for export")
 		raise ValueError("No data rows provided for export")
 	
-	# Determine output directory
-	output_dir = Path(output_dir or REPORTS_DIR)
-	
-	# Resolve relative paths relative to project root if needed
-	if not output_dir.is_absolute():
-		output_dir = Path(__file__).resolve().parent.parent / output_dir
-	
-	# Ensure the directory exists
-	output_dir.mkdir(parents=True, exist_ok=True)
-	
-	# Generate filename with timestamp
-	timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-	filename = output_dir / f'prices_{timestamp}.csv'
+	filename = _timestamped_path(output_dir, 'prices')
 	
 	try:
 		with open(filename, 'w', newline='', encoding='utf-8') as f:
@@ -75,9 +78,60 @@ def export_prices_to_csv(
 			for row in rows:
 				writer.writerow(row)
 		
-		logger.info(f"Successfully exported {len(rows)} rows to {filename}")
+		logger.info("Successfully exported %s rows to %s", len(rows), filename)
+		return str(filename)
+	
+	except Exception as e:
+		logger.error("Error exporting to CSV: %s", e)
+		raise
+
+
+def export_price_history_to_csv(
+		db,
+		resolution: str = 'raw',
+		output_dir: Optional[Union[str, Path]] = None,
+		product_id: Optional[int] = None,
+		start: Optional[str] = None,
+		end: Optional[str] = None
+) -> str:
+	"""Export price history at a given resolution to a CSV file.
+	
+	Coarser resolutions read the matching rollup table instead of every raw
+	price point, so long-range exports touch far fewer rows.
+	
+	Args:
+		db: Database to read from
+		resolution: 'raw', 'daily', 'weekly' or 'monthly'
+		output_dir: Directory to save the CSV file. If None, uses REPORTS_DIR from config.
+		product_id: Only export this product's history
+		start: Only history from this ISO date/timestamp on
+		end: Only history before this ISO date/timestamp
+		
+	Returns:
+		str: Path to the generated CSV file
+		
+	Raises:
+		ValueError: If there is no history or the resolution is unknown
+		OSError: If there's an error writing the file
+	"""
+	rows = db.get_price_history(product_id, resolution=resolution, start=start, end=end)
+	if not rows:
+		logger.warning("No price history to export")
+		raise ValueError("No price history to export")
+	
+	filename = _timestamped_path(output_dir, f'history_{resolution}')
+	header = list(rows[0].keys())
+	
+	try:
+		with open(filename, 'w', newline='', encoding='utf-8') as f:
+			writer = csv.writer(f)
+			writer.writerow(header)
+			for row in rows:
+				writer.writerow(tuple(row))
+		
+		logger.info("Exported %s %s history rows to %s", len(rows), resolution, filename)
 		return str(filename)
 	
 	except Exception as e:
-		logger.error(f"Error exporting to CSV: {str(e)}")
+		logger.error("Error exporting history to CSV: %s", e)
 		raise
@@ -0,0 +1,233 @@
+"""Read-only HTTP/JSON price query service.
+
+Dashboards query this service instead of opening the SQLite file directly.
+Queries run on a pool of read-only connections, and results are kept in an
+LRU cache with a TTL. The cache is dropped whenever a new scrape run has been
+recorded (``Database.record_scrape_run``), so repeated reads between runs
+never touch the database.
+
+Endpoints:
+	GET /health
+	GET /prices/latest
+	GET /products/<id>/history?resolution=raw|daily|weekly|monthly&start=ISO&end=ISO
+	GET /movers?days=7&limit=10
+"""
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Hashable, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+# Import configuration
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config import (
+	QUERY_HOST, QUERY_PORT, QUERY_POOL_SIZE,
+	QUERY_CACHE_SIZE, QUERY_CACHE_TTL
+)
+from scraper.database import (
+	Database, ReadOnlyConnectionPool, RESOLUTIONS, query_latest_prices,
+	query_price_history, query_top_movers, query_data_generation
+)
+
+# Set up logging
+from scraper.logging_setup import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+_HISTORY_PATH = re.compile(r'^/products/(\d+)/history$')
+
+
+class TTLCache:
+	"""Thread-safe LRU cache whose entries also expire after ``ttl`` seconds."""
+
+	def __init__(self, maxsize: int = 256, ttl: float = 60.0):
+		self.maxsize = maxsize
+		self.ttl = ttl
+		self._lock = threading.Lock()
+		self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+
+	def get(self, key: Hashable, default: Any = None) -> Any:
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is None or entry[0] < time.monotonic():
+				if entry is not None:
+					del self._entries[key]
+				self.misses += 1
+				return default
+			self._entries.move_to_end(key)
+			self.hits += 1
+			return entry[1]
+
+	def put(self, key: Hashable, value: Any):
+		with self._lock:
+			self._entries[key] = (time.monotonic() + self.ttl, value)
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.maxsize:
+				self._entries.popitem(last=False)
+
+	def clear(self):
+		with self._lock:
+			self._entries.clear()
+
+	def __len__(self):
+		return len(self._entries)
+
+
+class PriceQueryService:
+	"""Cached read-only queries over the price database."""
+
+	def __init__(
+			self,
+			db_url: Optional[str] = None,
+			pool_size: int = QUERY_POOL_SIZE,
+			cache_size: int = QUERY_CACHE_SIZE,
+			cache_ttl: float = QUERY_CACHE_TTL
+	):
+		# Make sure the schema exists before opening read-only connections
+		Database(db_url).close()
+		self.pool = ReadOnlyConnectionPool(db_url, pool_size)
+		self.cache = TTLCache(cache_size, cache_ttl)
+		self._generation = None
+		self._generation_lock = threading.Lock()
+
+	def _check_generation(self, conn) -> int:
+		"""Drop the cache if a scrape run finished since it was filled.
+
+		Returns:
+			The generation read, which results queried afterwards belong to
+		"""
+		generation = query_data_generation(conn)
+		with self._generation_lock:
+			if generation != self._generation:
+				if self._generation is not None:
+					logger.info("Scrape run %s recorded, clearing query cache", generation)
+				self.cache.clear()
+				self._generation = generation
+		return generation
+
+	def _cached(self, key: Tuple, query: Callable) -> Any:
+		# Entries are tagged with the generation they were read at. A query that
+		# raced a newer scrape run is neither stored nor served once the cache
+		# has moved on, even if it finishes after the clear.
+		with self.pool.connection() as conn:
+			generation = self._check_generation(conn)
+			entry = self.cache.get(key)
+			if entry is not None and entry[0] == generation:
+				return entry[1]
+			result = [dict(row) for row in query(conn)]
+			with self._generation_lock:
+				if generation == self._generation:
+					self.cache.put(key, (generation, result))
+			return result
+
+	def latest_prices(self):
+		return self._cached(('latest',), query_latest_prices)
+
+	def price_history(
+			self,
+			product_id: int,
+			resolution: str = 'raw',
+			start: Optional[str] = None,
+			end: Optional[str] = None
+	):
+		if resolution not in RESOLUTIONS:
+			raise ValueError(f"Unknown resolution {resolution!r}, expected one of {', '.join(RESOLUTIONS)}")
+		return self._cached(
+			('history', product_id, resolution, start, end),
+			lambda conn: query_price_history(
+				conn, product_id, resolution, start, end, archive_dir=self.pool.archive_dir
+			)
+		)
+
+	def top_movers(self, days: int = 7, limit: int = 10):
+		return self._cached(('movers', days, limit), lambda conn: query_top_movers(conn, days, limit))
+
+	def close(self):
+		self.pool.close()
+
+
+class _QueryHandler(BaseHTTPRequestHandler):
+	service: PriceQueryService
+
+	def _send_json(self, status: int, payload: Any):
+		body = json.dumps(payload).encode('utf-8')
+		self.send_response(status)
+		self.send_header('Content-Type', 'application/json')
+		self.send_header('Content-Length', str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def do_GET(self):
+		parsed = urlparse(self.path)
+		params = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+		try:
+			if parsed.path == '/health':
+				payload: Any = {
+					'status': 'ok',
+					'cache_entries': len(self.service.cache),
+					'cache_hits': self.service.cache.hits,
+					'cache_misses': self.service.cache.misses,
+				}
+			elif parsed.path == '/prices/latest':
+				payload = self.service.latest_prices()
+			elif _HISTORY_PATH.match(parsed.path):
+				product_id = int(_HISTORY_PATH.match(parsed.path).group(1))
+				payload = self.service.price_history(
+					product_id, params.get('resolution', 'raw'), params.get('start'), params.get('end')
+				)
+			elif parsed.path == '/movers':
+				payload = self.service.top_movers(int(params.get('days', 7)), int(params.get('limit', 10)))
+			else:
+				self._send_json(404, {'error': f'Unknown path: {parsed.path}'})
+				return
+		except ValueError as e:
+			self._send_json(400, {'error': str(e)})
+			return
+		except Exception as e:
+			logger.error("Query failed for %s: %s", self.path, e, exc_info=True)
+			self._send_json(500, {'error': 'Internal error'})
+			return
+		self._send_json(200, payload)
+
+	def log_message(self, format, *args):
+		logger.debug(format, *args)
+
+
+def create_server(
+		service: PriceQueryService,
+		host: str = QUERY_HOST,
+		port: int = QUERY_PORT
+) -> ThreadingHTTPServer:
+	"""Build (but do not start) the HTTP server for ``service``."""
+	handler = type('QueryHandler', (_QueryHandler,), {'service': service})
+	return ThreadingHTTPServer((host, port), handler)
+
+
+def serve_queries(host: str = QUERY_HOST, port: int = QUERY_PORT, db_url: Optional[str] = None):
+	"""Run the query service until interrupted."""
+	service = PriceQueryService(db_url)
+	server = create_server(service, host, port)
+	logger.info("Query service listening on http://%s:%s", host, server.server_port)
+	print(f"==> Query service listening on http://{host}:{server.server_port}")
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+		service.close()
+		print("==> Query service stopped")
+
+
+if __name__ == '__main__':
+	serve_queries()
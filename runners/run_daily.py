@@ -1,34 +1,60 @@
 import logging
+from datetime import datetime
+from typing import Optional
 
 # Import configuration
 import sys
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent.parent))
-from config import LOG_LEVEL, LOG_FILE
 
 # Set up logging
-logging.basicConfig(
-	level=getattr(logging, LOG_LEVEL, logging.INFO),
-	format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-	filename=LOG_FILE if LOG_FILE else None
-)
+from scraper.logging_setup import setup_logging
+
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Local imports after config setup
 from runners.run_once import run_once
 
 
-def run_daily():
-	"""Run the daily scraping and reporting workflow."""
+def run_daily(deadline: Optional[datetime] = None, max_duration: Optional[float] = None):
+	"""Run the daily scraping and reporting workflow.
+	
+	Args:
+		deadline: Wall-clock time the run must finish by (see ``run_once``)
+		max_duration: Seconds the run may take. Defaults to RUN_MAX_DURATION.
+	"""
 	try:
 		logger.info("Starting daily scraping and reporting")
 		
 		# Run the scraper + export via run_once
-		summary = run_once(verbose=False)
-		urls = summary.get("urls", 0) if isinstance(summary, dict) else 0
-		exported = summary.get("exported_rows", 0) if isinstance(summary, dict) else 0
-		csv_path = summary.get("csv_path") if isinstance(summary, dict) else None
+		summary = run_once(verbose=False, deadline=deadline, max_duration=max_duration)
+		summary = summary if isinstance(summary, dict) else {}
+		urls = summary.get("urls", 0)
+		exported = summary.get("exported_rows", 0)
+		csv_path = summary.get("csv_path")
+		
+		block_rates = summary.get("proxy_block_rates", {})
+		if summary.get("blocked"):
+			for label, rate in sorted(block_rates.items()):
+				print(f"Proxy {label}: {rate:.1%} blocked")
+		
+		latency = summary.get("latency", {})
+		if latency.get("count"):
+			print(
+				f"Run time: {summary['run_seconds']:.1f}s, "
+				f"p95/p99 latency: {latency['p95']:.2f}s/{latency['p99']:.2f}s, "
+				f"hedges: {summary.get('hedges', 0)} sent, {summary.get('hedge_wins', 0)} won"
+			)
+		
+		if summary.get("deadline_reached"):
+			print(
+				f"Deadline reached: skipped {summary.get('skipped', 0)} URLs, "
+				f"{summary.get('retries_used', 0)} retries used, {summary.get('retries_denied', 0)} denied"
+			)
+		elif summary.get("retries_denied"):
+			print(f"Retry budget spent: {summary['retries_denied']} retries skipped")
 		
 		if exported:
 			print(f"Exported {exported} rows to: {csv_path}")
@@ -39,7 +65,7 @@ def run_daily():
 		return summary
 	
 	except Exception as e:
-		logger.critical(f"Error in daily run: {str(e)}", exc_info=True)
+		logger.critical("Error in daily run: %s", e, exc_info=True)
 		raise
 	finally:
 		logger.info("Daily run completed")
@@ -1,89 +1,376 @@
 from pathlib import Path
 import logging
-from typing import List
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Iterable
 
 # Import configuration
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
-from config import PRODUCTS_FILE, LOG_LEVEL, LOG_FILE, REPORTS_DIR
-from scraper.fetcher import get_page
+from config import (
+    PRODUCTS_FILE, REPORTS_DIR,
+    BLOCK_MAX_REQUEUES, BLOCK_BACKOFF, HEDGE_REQUESTS, MARKETPLACE_MAX_WORKERS,
+    RUN_MAX_DURATION, RUN_DEADLINE_MARGIN, RUN_DEADLINE_MARGIN_FRACTION, RETRY_BUDGET
+)
+from requests import Session
+from requests.exceptions import RequestException
+from scraper.fetcher import (
+    get_page, get_page_hedged, proxy_stats, latency_tracker, hedge_budget, run_budget,
+    SessionPool, BlockedPageError, PageNotFoundError
+)
+from scraper.budget import monotonic_deadline
+from scraper.marketplaces import marketplace_for_url, decimal_separator
+from scraper.classifier import BLOCKED_KINDS
 from scraper.parser import parse_amazon_product
 from scraper.database import Database
 from reports.exporter import export_prices_to_csv
 
 # Set up logging
-logging.basicConfig(
-    level=getattr(logging, LOG_LEVEL, logging.INFO),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    filename=LOG_FILE if LOG_FILE else None
-)
+from scraper.logging_setup import setup_logging, correlation_scope, new_correlation_id
+
+setup_logging()
 logger = logging.getLogger(__name__)
 
 
-def load_product_urls(products_file: str) -> List[str]:
-    """Load product URLs from a file.
+def load_products(products_file: str) -> Dict[str, int]:
+    """Load product URLs and their priorities from a file.
+    
+    Each non-empty line is a URL, optionally followed by whitespace and an
+    integer priority (higher is scraped first, default 0).
     
     Args:
         products_file: Path to the file containing product URLs
         
     Returns:
-        List of product URLs
+        Dict mapping each URL to its priority, in file order
     """
     try:
+        products: Dict[str, int] = {}
         with open(products_file) as f:
-            urls = [u.strip() for u in f if u.strip()]
-        logger.info(f"Loaded {len(urls)} product URLs from {products_file}")
-        return urls
+            for line in f:
+                fields = line.split()
+                if not fields:
+                    continue
+                try:
+                    priority = int(fields[1]) if len(fields) > 1 else 0
+                except ValueError:
+                    logger.warning("Ignoring invalid priority %r for %s", fields[1], fields[0])
+                    priority = 0
+                products[fields[0]] = priority
+        logger.info("Loaded %s product URLs from %s", len(products), products_file)
+        return products
     except FileNotFoundError:
-        logger.error(f"Products file not found: {products_file}")
+        logger.error("Products file not found: %s", products_file)
         raise
     except Exception as e:
-        logger.error(f"Error loading product URLs: {str(e)}")
+        logger.error("Error loading product URLs: %s", e)
         raise
 
 
-def process_product(url: str, db: Database) -> None:
+def load_product_urls(products_file: str) -> List[str]:
+    """Load product URLs from a file (see ``load_products``).
+    
+    Args:
+        products_file: Path to the file containing product URLs
+        
+    Returns:
+        List of product URLs
+    """
+    return list(load_products(products_file))
+
+
+def order_urls(
+    urls: List[str],
+    last_checked: Dict[str, Optional[str]],
+    priorities: Optional[Dict[str, int]] = None
+) -> List[str]:
+    """Order URLs by priority (highest first), then staleness.
+    
+    Among equal priorities, never-scraped URLs come first, then the ones
+    checked longest ago, so a run cut short by its deadline has refreshed
+    the data that was most out of date.
+    
+    Args:
+        urls: Product URLs to order
+        last_checked: ISO timestamp of each URL's last scrape
+        priorities: Optional priority per URL (default 0)
+    """
+    priorities = priorities or {}
+    return sorted(urls, key=lambda url: (-priorities.get(url, 0), last_checked.get(url) or ''))
+
+
+def process_product(
+    url: str,
+    db: Database,
+    exclude_proxies: Optional[Iterable[Optional[str]]] = None,
+    session: Optional[Session] = None
+) -> None:
     """Process a single product URL.
     
     Args:
         url: Product URL to process
         db: Database instance
+        exclude_proxies: Proxies to avoid for this fetch
+        session: Optional long-lived session to fetch with
+        
+    Raises:
+        BlockedPageError: If the page was a captcha/robot check, so the
+            caller can requeue it
     """
     try:
-        logger.info(f"Processing product: {url}")
-        html = get_page(url)
-        data = parse_amazon_product(html)
+        logger.info("Processing product: %s", url)
+        fetch = get_page_hedged if HEDGE_REQUESTS else get_page
+        html = fetch(url, exclude_proxies=exclude_proxies, session=session)
+        marketplace = marketplace_for_url(url)
+        data = parse_amazon_product(html, decimal_separator(marketplace))
         
         title = data.get('title')
         price = data.get('price')
         
         if not title or price is None:
-            logger.warning(f"Missing data for {url}: title={title is not None}, price={price is not None}")
+            logger.warning("Missing data for %s: title=%s, price=%s", url, title is not None, price is not None)
             return
             
         product_id = db.ensure_product(url, title, price)
-        db.add_price_history(product_id, price)
-        logger.info(f"Updated product: {title} - ${price:.2f}")
+        db.add_price_history(
+            product_id,
+            price,
+            price_raw=data.get('price_raw'),
+            currency=data.get('currency'),
+            marketplace=marketplace
+        )
+        logger.info("Updated product: %s - $%.2f", title, price)
         
+    except PageNotFoundError as e:
+        logger.warning("Skipping %s: %s", url, e)
+    except BlockedPageError as e:
+        logger.warning("Blocked while processing %s: %s", url, e)
+        raise
     except Exception as e:
-        logger.error(f"Error processing {url}: {str(e)}")
+        logger.error("Error processing %s: %s", url, e)
         raise
 
 
-def run_once(verbose: bool = True):
-    """Run the scraper once for all products."""
+def _scrape_marketplace(
+    domain: str,
+    urls: List[str],
+    db: Database,
+    session: Session,
+    stop_event: Optional[threading.Event] = None
+) -> Dict[str, int]:
+    """Scrape one marketplace's URLs in order, requeueing blocked ones.
+    
+    A blocked URL goes to the back of the queue with exponential backoff
+    (BLOCK_BACKOFF * 2**attempt seconds) and is retried up to
+    BLOCK_MAX_REQUEUES times, avoiding the proxies it was blocked on. Each
+    requeue is drawn from ``run_budget``; once the budget is spent or the
+    deadline is near, blocked URLs are given up and no new URLs are started.
+    """
+    # (url, attempt, proxies that were blocked, monotonic time not to retry before,
+    #  correlation id shared by every attempt's log records)
+    queue = deque((url, 0, (), 0.0, new_correlation_id()) for url in urls)
+    blocked = 0
+    gave_up = 0
+    failed = 0
+    
+    while queue:
+        if stop_event is not None and stop_event.is_set():
+            logger.warning("Stop requested, skipping %s remaining URLs on %s", len(queue), domain)
+            break
+        if run_budget.expired():
+            logger.warning("Run deadline near, skipping %s remaining URLs on %s", len(queue), domain)
+            break
+        url, attempt, tried, not_before, cid = queue.popleft()
+        wait = not_before - time.monotonic()
+        if wait > 0:
+            # Never back off past the deadline
+            time_left = run_budget.time_left()
+            pause = wait if time_left is None else min(wait, max(time_left, 0.0))
+            if stop_event is not None:
+                stopped = stop_event.wait(pause)
+            else:
+                time.sleep(pause)
+                stopped = False
+            if stopped or pause < wait:
+                queue.appendleft((url, attempt, tried, not_before, cid))
+                continue
+        try:
+            with correlation_scope(cid):
+                process_product(url, db, exclude_proxies=tried, session=session)
+        except BlockedPageError as e:
+            blocked += 1
+            if attempt >= BLOCK_MAX_REQUEUES:
+                gave_up += 1
+                logger.error("Giving up on %s after %s blocked attempts", url, attempt + 1)
+                continue
+            if not run_budget.try_retry():
+                gave_up += 1
+                logger.warning("Retry budget spent or deadline near, not requeueing %s", url)
+                continue
+            delay = BLOCK_BACKOFF * (2 ** attempt)
+            logger.info("Requeueing %s in %.1fs (attempt %s)", url, delay, attempt + 2)
+            queue.append((url, attempt + 1, tried + (e.proxy,), time.monotonic() + delay, cid))
+        except RequestException as e:
+            # Retries (or the retry budget) are exhausted; move on to the next URL
+            failed += 1
+            logger.error("Failed to fetch %s: %s", url, e)
+    
+    return {"blocked": blocked, "gave_up": gave_up, "failed": failed, "skipped": len(queue)}
+
+
+def scrape_urls(
+    urls: List[str],
+    db: Database,
+    sessions: Optional[SessionPool] = None,
+    stop_event: Optional[threading.Event] = None,
+    priorities: Optional[Dict[str, int]] = None,
+    deadline: Optional[float] = None,
+    retry_budget: Optional[int] = RETRY_BUDGET
+) -> Dict[str, Any]:
+    """Scrape every URL, one worker per marketplace.
+    
+    URLs are ordered by priority and staleness (see ``order_urls``), then
+    grouped by their domain; each marketplace is scraped sequentially (so
+    its politeness delay applies) with its own session, and up to
+    MARKETPLACE_MAX_WORKERS marketplaces run in parallel.
+    
+    Args:
+        urls: Product URLs to process
+        db: Database instance
+        sessions: Optional long-lived per-marketplace sessions; a temporary
+            pool is used (and closed) if omitted
+        stop_event: When set, no further URLs are started; URLs in flight
+            finish and the remaining ones are skipped
+        priorities: Optional priority per URL (see ``load_products``)
+        deadline: ``time.monotonic()`` value the run must finish by; no URLs
+            or retries are started within RUN_DEADLINE_MARGIN of it (capped
+            at RUN_DEADLINE_MARGIN_FRACTION of the time left)
+        retry_budget: HTTP retries and blocked-URL requeues allowed across
+            the whole run (None for no limit)
+        
+    Returns:
+        Dict with the number of blocked responses, URLs given up on, failed
+        and skipped, the per-proxy block rate, total run time, recent request
+        latency percentiles, hedging counters and retry budget usage for
+        this run
+    """
+    run_started = time.monotonic()
+    proxy_stats.reset()
+    hedge_budget.reset()
+    margin = RUN_DEADLINE_MARGIN
+    if deadline is not None:
+        # A serve cycle's window can be shorter than the margin itself
+        margin = min(margin, max(deadline - run_started, 0.0) * RUN_DEADLINE_MARGIN_FRACTION)
+    run_budget.start(retry_budget, deadline, margin)
+    
+    by_marketplace: Dict[str, List[str]] = {}
+    for url in order_urls(urls, db.get_last_checked(), priorities):
+        by_marketplace.setdefault(marketplace_for_url(url), []).append(url)
+    
+    owns_sessions = sessions is None
+    if owns_sessions:
+        sessions = SessionPool()
+    
+    totals = {"blocked": 0, "gave_up": 0, "failed": 0, "skipped": 0}
+    try:
+        workers = max(1, min(len(by_marketplace), MARKETPLACE_MAX_WORKERS))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='marketplace') as executor:
+            futures = [
+                executor.submit(
+                    _scrape_marketplace, domain, domain_urls, db, sessions.get(domain), stop_event
+                )
+                for domain, domain_urls in by_marketplace.items()
+            ]
+            for future in futures:
+                for key, value in future.result().items():
+                    totals[key] += value
+    finally:
+        if owns_sessions:
+            sessions.close()
+    
+    block_rates = proxy_stats.block_rates(BLOCKED_KINDS)
+    for label, rate in sorted(block_rates.items()):
+        logger.info("Proxy %s: block rate %.1f%%", label, rate * 100)
+    
+    run_seconds = time.monotonic() - run_started
+    latency = latency_tracker.summary()
+    hedging = hedge_budget.snapshot()
+    retries = run_budget.snapshot()
+    if latency["count"]:
+        logger.info(
+            "Run took %.1fs; request latency p50=%.2fs p95=%.2fs p99=%.2fs; hedges sent=%s won=%s",
+            run_seconds, latency['p50'], latency['p95'], latency['p99'],
+            hedging['hedges'], hedging['hedge_wins']
+        )
+    if retries["retries_denied"] or totals["skipped"]:
+        logger.warning(
+            "Retries used=%s denied=%s; %s URLs skipped (deadline reached: %s)",
+            retries['retries_used'], retries['retries_denied'], totals['skipped'], retries['deadline_reached']
+        )
+    
+    return {
+        **totals,
+        "marketplaces": len(by_marketplace),
+        "proxy_block_rates": block_rates,
+        "run_seconds": run_seconds,
+        "latency": latency,
+        **hedging,
+        **retries,
+    }
+
+
+def resolve_products_file() -> Path:
+    """Return PRODUCTS_FILE resolved relative to the project root."""
+    products_file = Path(PRODUCTS_FILE)
+    if not products_file.is_absolute():
+        root = Path(__file__).resolve().parent.parent
+        products_file = root / products_file
+    return products_file
+
+
+def run_once(
+    verbose: bool = True,
+    db: Optional[Database] = None,
+    urls: Optional[List[str]] = None,
+    sessions: Optional[SessionPool] = None,
+    stop_event: Optional[threading.Event] = None,
+    priorities: Optional[Dict[str, int]] = None,
+    deadline: Optional[datetime] = None,
+    max_duration: Optional[float] = None
+):
+    """Run the scraper once for all products.
+    
+    When a deadline or maximum duration is given, scraping stops early
+    enough (RUN_DEADLINE_MARGIN) that what was scraped is still committed
+    and exported.
+    
+    Args:
+        verbose: Print progress to stdout
+        db: Database to reuse; a new one is opened if omitted
+        urls: Product URLs to scrape; loaded from PRODUCTS_FILE if omitted
+        sessions: Optional long-lived per-marketplace sessions
+        stop_event: Stops the run early (see ``scrape_urls``)
+        priorities: Priority per URL; loaded with the URLs if omitted
+        deadline: Wall-clock time the run must finish by
+        max_duration: Seconds the run may take. Defaults to RUN_MAX_DURATION.
+            If both are set, the earlier limit applies.
+    """
+    if max_duration is None:
+        max_duration = RUN_MAX_DURATION
+    run_deadline = monotonic_deadline(deadline, max_duration)
     try:
-        # Resolve products file path
-        products_file = Path(PRODUCTS_FILE)
-        if not products_file.is_absolute():
-            root = Path(__file__).resolve().parent.parent
-            products_file = root / products_file
+        products_file = resolve_products_file()
         
         if verbose:
             print("==> Starting once run")
             print(f"Products file: {products_file}")
         logger.info("Starting product scraper")
-        urls = load_product_urls(str(products_file))
+        if urls is None:
+            priorities = load_products(str(products_file))
+            urls = list(priorities)
         
         if verbose:
             print(f"Loaded {len(urls)} URLs")
@@ -93,10 +380,18 @@ def run_once(verbose: bool = True):
                 print("No product URLs found to process.")
             return {"urls": 0, "exported_rows": 0, "csv_path": None}
             
-        db = Database()
+        if db is None:
+            db = Database()
         
-        for url in urls:
-            process_product(url, db)
+        scrape_stats = scrape_urls(
+            urls, db, sessions=sessions, stop_event=stop_event,
+            priorities=priorities, deadline=run_deadline
+        )
+        db.record_scrape_run(len(urls))
+        if verbose and scrape_stats["blocked"]:
+            print(f"Blocked responses: {scrape_stats['blocked']} (gave up on {scrape_stats['gave_up']} URLs)")
+        if verbose and scrape_stats["skipped"]:
+            print(f"Stopped early: skipped {scrape_stats['skipped']} URLs")
             
         # Prepare CSV export of current prices
         rows = db.get_all_prices()
@@ -107,7 +402,7 @@ def run_once(verbose: bool = True):
             logger.info("Product scraping completed successfully")
             if verbose:
                 print("==> Once run completed")
-            return {"urls": len(urls), "exported_rows": 0, "csv_path": None}
+            return {"urls": len(urls), "exported_rows": 0, "csv_path": None, **scrape_stats}
 
         if verbose:
             print(f"Preparing to export {len(rows)} rows to CSV...")
@@ -131,17 +426,17 @@ def run_once(verbose: bool = True):
 
         # Export to CSV
         filename = export_prices_to_csv(export_rows, str(reports_dir))
-        logger.info(f"Exported price data to: {filename}")
+        logger.info("Exported price data to: %s", filename)
         if verbose:
             print(f"Exported {len(export_rows)} rows to: {filename}")
 
         logger.info("Product scraping completed successfully")
         if verbose:
             print("==> Once run completed")
-        return {"urls": len(urls), "exported_rows": len(export_rows), "csv_path": filename}
+        return {"urls": len(urls), "exported_rows": len(export_rows), "csv_path": filename, **scrape_stats}
         
     except Exception as e:
-        logger.critical(f"Fatal error in run_once: {str(e)}", exc_info=True)
+        logger.critical("Fatal error in run_once: %s", e, exc_info=True)
         raise
 
 
@@ -0,0 +1,146 @@
+import logging
+import os
+import signal
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Import configuration
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config import SERVE_INTERVAL, SERVE_CRON
+
+# Set up logging
+from scraper.logging_setup import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Local imports after config setup
+from runners.run_once import run_once, load_products, resolve_products_file
+from runners.scheduler import parse_schedule, IntervalSchedule
+from scraper.database import Database
+from scraper.fetcher import SessionPool
+
+
+class ProductsWatcher:
+	"""Cache the product list and reload it only when the file changes."""
+
+	def __init__(self, products_file: Path):
+		self.products_file = products_file
+		self._signature: Optional[Tuple[int, int]] = None
+		self._products: Dict[str, int] = {}
+
+	def urls(self) -> List[str]:
+		return list(self.products())
+
+	def products(self) -> Dict[str, int]:
+		"""Return the product URLs mapped to their priorities."""
+		try:
+			stat = os.stat(self.products_file)
+		except OSError as e:
+			logger.error("Cannot stat products file %s: %s", self.products_file, e)
+			return self._products
+
+		signature = (stat.st_mtime_ns, stat.st_size)
+		if signature != self._signature:
+			try:
+				self._products = load_products(str(self.products_file))
+				self._signature = signature
+			except Exception:
+				logger.error("Keeping previous product list after failed reload")
+		return self._products
+
+
+def serve(
+		interval: Optional[float] = None,
+		cron: Optional[str] = None,
+		stop_event: Optional[threading.Event] = None
+) -> int:
+	"""Run scrape cycles on a schedule until SIGTERM/SIGINT.
+
+	The database connection, per-marketplace HTTP sessions (and their
+	connection pools) and the product list stay in memory between cycles.
+	On a stop signal the URLs in flight finish, what was scraped is
+	exported, and the loop exits. Each cycle's deadline is the next
+	scheduled start, so a slow cycle never runs into the next one.
+
+	Args:
+		interval: Seconds between cycle starts. Defaults to SERVE_INTERVAL.
+		cron: 5-field cron expression; takes precedence over ``interval``.
+			Defaults to SERVE_CRON.
+		stop_event: Event that stops the daemon; created if omitted
+
+	Returns:
+		int: Number of completed cycles
+	"""
+	if cron is None and interval is None:
+		cron = SERVE_CRON
+	schedule = parse_schedule(interval or SERVE_INTERVAL, cron)
+	stop_event = stop_event or threading.Event()
+
+	previous_handlers = {}
+	if threading.current_thread() is threading.main_thread():
+		def _request_stop(signum, frame):
+			logger.info("Received signal %s, draining in-flight work", signum)
+			print("==> Stop requested, finishing current work")
+			stop_event.set()
+
+		for signum in (signal.SIGTERM, signal.SIGINT):
+			previous_handlers[signum] = signal.signal(signum, _request_stop)
+
+	db = Database()
+	sessions = SessionPool()
+	watcher = ProductsWatcher(resolve_products_file())
+	cycles = 0
+
+	now = datetime.now()
+	next_run = now if isinstance(schedule, IntervalSchedule) else schedule.next_run(now)
+	logger.info("Serving with %s, first cycle at %s", schedule, next_run.isoformat())
+	print(f"==> Serving with {schedule}")
+
+	try:
+		while not stop_event.is_set():
+			wait = (next_run - datetime.now()).total_seconds()
+			if wait > 0 and stop_event.wait(wait):
+				break
+
+			cycle_start = datetime.now()
+			logger.info("Starting scheduled scrape cycle")
+			try:
+				products = watcher.products()
+				summary = run_once(
+					verbose=False,
+					db=db,
+					urls=list(products),
+					sessions=sessions,
+					stop_event=stop_event,
+					priorities=products,
+					deadline=schedule.next_run(cycle_start)
+				)
+				cycles += 1
+				print(f"==> Cycle {cycles} done: {summary.get('exported_rows', 0)} rows exported")
+			except Exception as e:
+				# A failed cycle must not take the daemon down
+				logger.error("Scrape cycle failed: %s", e, exc_info=True)
+
+			now = datetime.now()
+			next_run = schedule.next_run(cycle_start)
+			if next_run < now:
+				next_run = schedule.next_run(now)
+			logger.info("Next cycle at %s", next_run.isoformat())
+	finally:
+		sessions.close()
+		db.close()
+		for signum, handler in previous_handlers.items():
+			signal.signal(signum, handler)
+		logger.info("Serve loop stopped after %s cycles", cycles)
+		print("==> Serve stopped")
+
+	return cycles
+
+
+if __name__ == '__main__':
+	serve()
@@ -0,0 +1,105 @@
+"""Schedules for the long-running ``serve`` daemon.
+
+Two kinds are supported: a fixed interval in seconds and a standard 5-field
+cron expression (minute hour day-of-month month day-of-week), evaluated in
+local time.
+"""
+from datetime import datetime, timedelta
+from typing import Optional, Set
+
+
+class IntervalSchedule:
+	"""Run every ``seconds`` seconds, starting immediately."""
+
+	def __init__(self, seconds: float):
+		if seconds <= 0:
+			raise ValueError(f"Interval must be positive, got {seconds}")
+		self.seconds = seconds
+
+	def next_run(self, after: datetime) -> datetime:
+		return after + timedelta(seconds=self.seconds)
+
+	def __repr__(self):
+		return f"IntervalSchedule({self.seconds}s)"
+
+
+def _parse_field(field: str, low: int, high: int) -> Set[int]:
+	"""Expand one cron field (``*``, ``*/n``, ``a-b``, ``a-b/n``, lists) to a set."""
+	values: Set[int] = set()
+	for part in field.split(','):
+		step = 1
+		if '/' in part:
+			part, step_text = part.split('/', 1)
+			step = int(step_text)
+			if step <= 0:
+				raise ValueError(f"Invalid cron step: {step_text}")
+		if part == '*':
+			start, end = low, high
+		elif '-' in part:
+			start_text, end_text = part.split('-', 1)
+			start, end = int(start_text), int(end_text)
+		else:
+			start = int(part)
+			end = high if step != 1 else start
+		if start < low or end > high or start > end:
+			raise ValueError(f"Cron field value out of range {low}-{high}: {field}")
+		values.update(range(start, end + 1, step))
+	return values
+
+
+class CronSchedule:
+	"""Run at times matching a 5-field cron expression."""
+
+	def __init__(self, expression: str):
+		fields = expression.split()
+		if len(fields) != 5:
+			raise ValueError(f"Cron expression must have 5 fields: {expression!r}")
+		self.expression = expression
+		self.minutes = _parse_field(fields[0], 0, 59)
+		self.hours = _parse_field(fields[1], 0, 23)
+		self.days = _parse_field(fields[2], 1, 31)
+		self.months = _parse_field(fields[3], 1, 12)
+		# 0 and 7 both mean Sunday
+		self.weekdays = {d % 7 for d in _parse_field(fields[4], 0, 7)}
+		self._any_day = fields[2] == '*'
+		self._any_weekday = fields[4] == '*'
+
+	def _day_matches(self, dt: datetime) -> bool:
+		day_ok = dt.day in self.days
+		weekday_ok = (dt.weekday() + 1) % 7 in self.weekdays
+		# Standard cron: if both day fields are restricted, either may match
+		if not self._any_day and not self._any_weekday:
+			return day_ok or weekday_ok
+		return day_ok and weekday_ok
+
+	def next_run(self, after: datetime) -> datetime:
+		"""Return the first matching minute strictly after ``after``."""
+		dt = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+		limit = dt + timedelta(days=366 * 5)
+		while dt <= limit:
+			if dt.month not in self.months:
+				dt = (dt.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+				continue
+			if not self._day_matches(dt):
+				dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+				continue
+			if dt.hour not in self.hours:
+				dt = dt.replace(minute=0) + timedelta(hours=1)
+				continue
+			if dt.minute not in self.minutes:
+				dt += timedelta(minutes=1)
+				continue
+			return dt
+		raise ValueError(f"Cron expression never matches: {self.expression!r}")
+
+	def __repr__(self):
+		return f"CronSchedule({self.expression!r})"
+
+
+def parse_schedule(interval: Optional[float] = None, cron: Optional[str] = None):
+	"""Build a schedule from CLI/config values; ``cron`` wins over ``interval``."""
+	if cron:
+		return CronSchedule(cron)
+	if interval:
+		return IntervalSchedule(interval)
+	raise ValueError("Either an interval or a cron expression is required")
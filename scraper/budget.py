@@ -0,0 +1,152 @@
+"""Run-wide time and retry budgets.
+
+A run may be given a deadline (absolute, or derived from a maximum duration)
+and a global retry budget shared by every request of the run. The fetcher's
+urllib3 ``Retry`` consumes from the budget, so once it is spent, or the
+deadline is near, failing requests give up instead of backing off again.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from urllib3.util.retry import Retry
+
+
+class RunBudget:
+	"""Deadline and retry allowance for the current run (thread-safe)."""
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self.start()
+
+	def start(
+			self,
+			max_retries: Optional[int] = None,
+			deadline: Optional[float] = None,
+			margin: float = 0.0
+	):
+		"""Begin a new run.
+
+		Args:
+			max_retries: Retries allowed across all requests; None for no limit
+			deadline: ``time.monotonic()`` value by which the run must end
+			margin: Seconds before the deadline reserved for committing and
+				exporting; no new work (or retries) starts inside it
+		"""
+		with self._lock:
+			self.max_retries = max_retries
+			self.deadline = deadline
+			self.margin = margin
+			self.retries_used = 0
+			self.retries_denied = 0
+
+	def time_left(self) -> Optional[float]:
+		"""Seconds until the deadline minus the margin; None without a deadline."""
+		if self.deadline is None:
+			return None
+		return self.deadline - self.margin - time.monotonic()
+
+	def expired(self) -> bool:
+		left = self.time_left()
+		return left is not None and left <= 0
+
+	def request_timeout(self, timeout: float) -> float:
+		"""Cap a request timeout so it cannot run past the deadline."""
+		left = self.time_left()
+		if left is None:
+			return timeout
+		return max(1.0, min(timeout, left))
+
+	def try_retry(self, wait: float = 0.0) -> bool:
+		"""Consume one retry; False if the budget is spent or time is up.
+
+		Args:
+			wait: Seconds the retry must wait before it is sent (Retry-After
+				or backoff); it is denied when that wait would reach past the
+				deadline
+		"""
+		with self._lock:
+			left = self.time_left()
+			out_of_time = left is not None and left <= wait
+			if out_of_time or (self.max_retries is not None and self.retries_used >= self.max_retries):
+				self.retries_denied += 1
+				return False
+			self.retries_used += 1
+			return True
+
+	def snapshot(self) -> dict:
+		with self._lock:
+			return {
+				'retries_used': self.retries_used,
+				'retries_denied': self.retries_denied,
+				'deadline_reached': self.expired(),
+			}
+
+
+class BudgetedRetry(Retry):
+	"""urllib3 Retry that also draws every retry from a shared RunBudget."""
+
+	def __init__(self, *args, budget: Optional[RunBudget] = None, **kwargs):
+		super().__init__(*args, **kwargs)
+		self.budget = budget
+
+	def new(self, **kw):
+		retry = super().new(**kw)
+		retry.budget = self.budget
+		return retry
+
+	def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+		kwargs = dict(method=method, url=url, response=response, error=error, _pool=_pool, _stacktrace=_stacktrace)
+		# urllib3 decides first (it raises when the request is not retryable or
+		# its own counts are spent), so only retries that will happen are charged
+		retry = super().increment(**kwargs)
+		# urllib3 sleeps for Retry-After or the exponential backoff before retrying
+		wait = max(self._requested_wait(response), retry.get_backoff_time())
+		if self.budget is not None and not self.budget.try_retry(wait):
+			# Out of budget: fail now, exactly as if the retry count were used up
+			return Retry.increment(self.new(total=0), **kwargs)
+		return retry
+
+	def _requested_wait(self, response) -> float:
+		if response is None or not self.respect_retry_after_header:
+			return 0.0
+		return super().get_retry_after(response) or 0.0
+
+	def get_retry_after(self, response):
+		"""Retry-After in seconds, capped so the sleep never passes the deadline."""
+		retry_after = super().get_retry_after(response)
+		left = self.budget.time_left() if self.budget is not None else None
+		if retry_after is None or left is None:
+			return retry_after
+		return max(0.0, min(retry_after, left))
+
+
+def parse_deadline(value: str, now: Optional[datetime] = None) -> datetime:
+	"""Parse ``HH:MM`` (next occurrence, local time) or an ISO datetime."""
+	now = now or datetime.now()
+	try:
+		parsed = datetime.strptime(value, '%H:%M')
+	except ValueError:
+		return datetime.fromisoformat(value)
+	deadline = now.replace(hour=parsed.hour, minute=parsed.minute, second=0, microsecond=0)
+	if deadline <= now:
+		deadline += timedelta(days=1)
+	return deadline
+
+
+def monotonic_deadline(
+		deadline: Optional[datetime] = None,
+		max_duration: Optional[float] = None
+) -> Optional[float]:
+	"""Convert a wall-clock deadline and/or a max duration to a monotonic deadline.
+
+	When both are given the earlier one wins.
+	"""
+	candidates = []
+	if max_duration is not None:
+		candidates.append(time.monotonic() + max_duration)
+	if deadline is not None:
+		now = datetime.now(deadline.tzinfo) if deadline.tzinfo else datetime.now()
+		candidates.append(time.monotonic() + (deadline - now).total_seconds())
+	return min(candidates) if candidates else None
@@ -0,0 +1,76 @@
+"""Lightweight response classification run before the full HTML parse.
+
+Amazon answers throttled requests with a 200 status and a small captcha or
+"sorry" page. These are recognised with plain substring checks and a size
+heuristic so they never reach BeautifulSoup.
+"""
+from typing import Tuple
+
+PAGE_PRODUCT = 'product'
+PAGE_CAPTCHA = 'captcha'
+PAGE_ROBOT_CHECK = 'robot_check'
+PAGE_NOT_FOUND = 'not_found'
+PAGE_UNKNOWN = 'unknown'
+
+# Page kinds that mean the request was blocked and should be retried elsewhere
+BLOCKED_KINDS = frozenset({PAGE_CAPTCHA, PAGE_ROBOT_CHECK})
+
+# Block and error pages are a few KB; product pages are hundreds of KB.
+# Marker scans are only done on documents below this size.
+BLOCK_PAGE_MAX_SIZE = 64 * 1024
+
+PRODUCT_MARKERS: Tuple[str, ...] = (
+	'id="productTitle"',
+	"id='productTitle'",
+)
+
+ROBOT_CHECK_MARKERS: Tuple[str, ...] = (
+	'<title>Robot Check</title>',
+	"Sorry, we just need to make sure you're not a robot",
+	'To discuss automated access to Amazon data',
+	'api-services-support@amazon.com',
+	'Sorry! Something went wrong',
+)
+
+CAPTCHA_MARKERS: Tuple[str, ...] = (
+	'/errors/validateCaptcha',
+	'Type the characters you see in this image',
+	'captchacharacters',
+)
+
+NOT_FOUND_MARKERS: Tuple[str, ...] = (
+	"Sorry! We couldn't find that page",
+	'<title>Page Not Found</title>',
+	'Looking for something?',
+)
+
+
+def _contains_any(html: str, markers: Tuple[str, ...]) -> bool:
+	return any(marker in html for marker in markers)
+
+
+def classify_page(html: str) -> str:
+	"""Classify a fetched document without parsing it.
+
+	Args:
+		html: Raw response text
+
+	Returns:
+		str: One of PAGE_PRODUCT, PAGE_CAPTCHA, PAGE_ROBOT_CHECK,
+			PAGE_NOT_FOUND or PAGE_UNKNOWN
+	"""
+	if not html:
+		return PAGE_UNKNOWN
+
+	if _contains_any(html, PRODUCT_MARKERS):
+		return PAGE_PRODUCT
+
+	if len(html) <= BLOCK_PAGE_MAX_SIZE:
+		if _contains_any(html, ROBOT_CHECK_MARKERS):
+			return PAGE_ROBOT_CHECK
+		if _contains_any(html, CAPTCHA_MARKERS):
+			return PAGE_CAPTCHA
+		if _contains_any(html, NOT_FOUND_MARKERS):
+			return PAGE_NOT_FOUND
+
+	return PAGE_UNKNOWN
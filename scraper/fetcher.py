@@ -1,9 +1,17 @@
 import time
 import random
-from typing import Dict, Any, Optional
-from requests import Session
+import codecs
+import contextvars
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional, Iterable
+from lxml import etree
+from requests import Session, Response
+from requests.exceptions import RequestException
 from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 
 # Import configuration
 import sys
@@ -13,33 +21,180 @@ sys.path.append(str(Path(__file__).parent.parent))
 from config import (
 	SCRAPER_PROXY, SCRAPER_USE_RANDOM_PROXIES, REQUEST_TIMEOUT,
 	REQUEST_DELAY, REQUEST_RETRIES, REQUEST_BACKOFF_FACTOR,
-	AMAZON_DOMAIN, USER_AGENT, LOG_LEVEL, LOG_FILE
+	FETCH_STREAM, FETCH_STREAM_MAX_BYTES, FETCH_STREAM_CHUNK_SIZE,
+	HEDGE_PERCENTILE, HEDGE_BUDGET, HEDGE_MIN_SAMPLES, HEDGE_MAX_WORKERS,
+	USER_AGENT
 )
-from .utils import get_random_proxy
+from .budget import RunBudget, BudgetedRetry
+from .utils import get_random_proxy, proxy_label, ProxyStats, LatencyTracker, HedgeBudget
+from .marketplaces import marketplace_for_url, request_delay
+from .classifier import classify_page, BLOCKED_KINDS, PAGE_NOT_FOUND
 
 # Set up logging
 import logging
 
-logging.basicConfig(
-	level=getattr(logging, LOG_LEVEL, logging.INFO),
-	format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-	filename=LOG_FILE if LOG_FILE else None
-)
+from .logging_setup import setup_logging
+
+setup_logging()
 logger = logging.getLogger(__name__)
 
+# Element ids the parser needs; a streaming fetch stops once all have closed
+STREAM_TARGET_IDS = frozenset({'productTitle', 'corePrice_feature_div', 'availability'})
+
+# Page kinds seen per proxy during this process
+proxy_stats = ProxyStats()
+
+# Recent request latencies and the hedging budget (see get_page_hedged)
+latency_tracker = LatencyTracker()
+hedge_budget = HedgeBudget(HEDGE_BUDGET)
+
+# Deadline and global retry allowance of the current run (see scrape_urls)
+run_budget = RunBudget()
+_hedge_executor: Optional[ThreadPoolExecutor] = None
+_hedge_executor_lock = threading.Lock()
+
+
+class PageClassificationError(RequestException):
+	"""A 200 response that is not a usable product page."""
+	
+	def __init__(self, url: str, proxy: Optional[str], kind: str):
+		super().__init__(f"{kind} page for {url} via {proxy_label(proxy)}")
+		self.url = url
+		self.proxy = proxy
+		self.kind = kind
+
+
+class BlockedPageError(PageClassificationError):
+	"""Amazon served a captcha or robot-check page instead of the product."""
+
+
+class PageNotFoundError(PageClassificationError):
+	"""Amazon served its "page not found" page."""
+
+
+class RequestAborted(Exception):
+	"""The request was aborted because a hedged duplicate already won.
+	
+	Deliberately not an OSError/RequestException, so urllib3 does not
+	retry it and requests does not wrap it.
+	"""
+
+
+class AbortableRequest:
+	"""Handle that lets another thread abort an in-flight request.
+	
+	While a request runs inside ``_abortable(handle)``, the sockets it
+	waits on are registered here; ``abort()`` shuts them down so the
+	blocked thread returns at once instead of waiting for the response.
+	"""
+	
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._sockets: List[socket.socket] = []
+		self.aborted = threading.Event()
+	
+	def register(self, sock: Optional[socket.socket]):
+		if sock is None:
+			return
+		with self._lock:
+			self._sockets.append(sock)
+			aborted = self.aborted.is_set()
+		if aborted:
+			self._shutdown(sock)
+	
+	def abort(self):
+		with self._lock:
+			self.aborted.set()
+			sockets = list(self._sockets)
+		for sock in sockets:
+			self._shutdown(sock)
+	
+	@staticmethod
+	def _shutdown(sock: socket.socket):
+		try:
+			sock.shutdown(socket.SHUT_RDWR)
+		except OSError:
+			pass
+
+
+_current_request: contextvars.ContextVar[Optional[AbortableRequest]] = contextvars.ContextVar(
+	'current_request', default=None
+)
+
+
+class _AbortableConnectionMixin:
+	"""Register the connection's socket with the current AbortableRequest."""
+	
+	def request(self, *args, **kwargs):
+		handle = _current_request.get()
+		if handle is not None and handle.aborted.is_set():
+			raise RequestAborted()
+		return super().request(*args, **kwargs)
+	
+	def getresponse(self):
+		handle = _current_request.get()
+		if handle is None:
+			return super().getresponse()
+		handle.register(self.sock)
+		try:
+			return super().getresponse()
+		except Exception as e:
+			if handle.aborted.is_set():
+				raise RequestAborted() from e
+			raise
+
+
+class _AbortableHTTPConnection(_AbortableConnectionMixin, HTTPConnection):
+	pass
+
+
+class _AbortableHTTPSConnection(_AbortableConnectionMixin, HTTPSConnection):
+	pass
+
+
+class _AbortableHTTPConnectionPool(HTTPConnectionPool):
+	ConnectionCls = _AbortableHTTPConnection
+
+
+class _AbortableHTTPSConnectionPool(HTTPSConnectionPool):
+	ConnectionCls = _AbortableHTTPSConnection
+
+
+_ABORTABLE_POOLS = {'http': _AbortableHTTPConnectionPool, 'https': _AbortableHTTPSConnectionPool}
+
+
+class _AbortableAdapter(HTTPAdapter):
+	"""HTTPAdapter whose connections can be aborted via AbortableRequest."""
+	
+	def init_poolmanager(self, *args, **kwargs):
+		super().init_poolmanager(*args, **kwargs)
+		self.poolmanager.pool_classes_by_scheme = _ABORTABLE_POOLS
+	
+	def proxy_manager_for(self, proxy, **proxy_kwargs):
+		manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+		if not proxy.lower().startswith('socks'):
+			manager.pool_classes_by_scheme = _ABORTABLE_POOLS
+		return manager
+
 
 def create_session() -> Session:
-	"""Create a configured requests Session with retry strategy."""
+	"""Create a configured requests Session with retry strategy.
+	
+	Besides the per-request REQUEST_RETRIES limit, every retry is drawn from
+	``run_budget``, so none are attempted once the run's retry budget is spent
+	or its deadline is near.
+	"""
 	session = Session()
 	
-	retry_strategy = Retry(
+	retry_strategy = BudgetedRetry(
+		budget=run_budget,
 		total=REQUEST_RETRIES,
 		backoff_factor=REQUEST_BACKOFF_FACTOR,
 		status_forcelist=[429, 500, 502, 503, 504],
 		allowed_methods=["GET"]
 	)
 	
-	adapter = HTTPAdapter(
+	adapter = _AbortableAdapter(
 		max_retries=retry_strategy,
 		pool_connections=10,
 		pool_maxsize=10
@@ -52,65 +207,384 @@ def create_session() -> Session:
 	return session
 
 
-def get_page(url: str) -> str:
+def read_until_targets(
+		response: Response,
+		target_ids: frozenset = STREAM_TARGET_IDS,
+		max_bytes: int = FETCH_STREAM_MAX_BYTES,
+		chunk_size: int = FETCH_STREAM_CHUNK_SIZE
+) -> str:
 	"""
-	Fetch a web page with configurable settings.
+	Read a streamed response until every target element has been parsed.
+	
+	The body is decoded chunk by chunk (``iter_content`` undoes gzip/deflate/br
+	content encoding) and fed to an incremental lxml parser. Reading stops as
+	soon as the closing tag of every element in ``target_ids`` has been seen,
+	or once ``max_bytes`` of decoded content have been read.
 	
 	Args:
-		url: The URL to fetch
+		response: A response obtained with ``stream=True``
+		target_ids: Element ids that must be complete before stopping
+		max_bytes: Upper bound on decoded bytes to read (0 disables the cap)
+		chunk_size: Size of each read from the connection
 		
 	Returns:
-		str: The response text
-		
-	Raises:
-		requests.exceptions.RequestException: If the request fails
+		str: The (possibly truncated) HTML read so far
 	"""
-	session = create_session()
+	decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+	parser = etree.HTMLPullParser(events=('end',))
+	pending = set(target_ids)
+	parts = []
+	read = 0
+	
+	for chunk in response.iter_content(chunk_size=chunk_size):
+		if not chunk:
+			continue
+		read += len(chunk)
+		parts.append(decoder.decode(chunk))
+		parser.feed(chunk)
+		for _, element in parser.read_events():
+			element_id = element.get('id')
+			if element_id in pending:
+				pending.discard(element_id)
+		if not pending:
+			logger.debug("All target elements seen after %s bytes", read)
+			break
+		if max_bytes and read >= max_bytes:
+			logger.debug("Stream byte cap reached (%s bytes), missing: %s", read, pending)
+			break
+	
+	parts.append(decoder.decode(b'', final=True))
+	return ''.join(parts)
+
+
+def build_headers(domain: str) -> Dict[str, str]:
+	"""Request headers for a marketplace domain, e.g. ``www.amazon.de``."""
+	return {
+		"User-Agent": USER_AGENT,
+		"Accept-Language": "en-US,en;q=0.5",
+		'Host': domain,
+		'Origin': f'https://{domain}',
+		'Connection': 'keep-alive',
+		'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+		'Accept-Encoding': 'gzip, deflate, br',
+		'DNT': '1',
+		'Referer': f'https://{domain}/',
+		'Upgrade-Insecure-Requests': '1'
+	}
+
+
+class SessionPool:
+	"""One session (and so one connection pool) per marketplace domain."""
+	
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._sessions: Dict[str, Session] = {}
+	
+	def get(self, domain: str) -> Session:
+		with self._lock:
+			session = self._sessions.get(domain)
+			if session is None:
+				session = create_session()
+				self._sessions[domain] = session
+			return session
+	
+	def for_url(self, url: str) -> Session:
+		return self.get(marketplace_for_url(url))
+	
+	def close(self):
+		with self._lock:
+			for session in self._sessions.values():
+				session.close()
+			self._sessions.clear()
+
+
+def _choose_proxy(exclude_proxies: Optional[Iterable[Optional[str]]] = None) -> Optional[str]:
+	"""Pick the proxy for a request from config, avoiding ``exclude_proxies``."""
+	if SCRAPER_PROXY:
+		return SCRAPER_PROXY
+	if SCRAPER_USE_RANDOM_PROXIES:
+		return get_random_proxy(exclude_proxies) if exclude_proxies else get_random_proxy()
+	return None
+
+
+def _polite_delay(domain: str):
+	"""Sleep the marketplace's request delay (with jitter) to be nice to Amazon."""
+	base_delay = request_delay(domain, REQUEST_DELAY)
+	if base_delay > 0:
+		jitter = base_delay * 0.5
+		delay = max(0.0, base_delay + random.uniform(-jitter, jitter))
+		logger.debug("Waiting %.2f seconds before request", delay)
+		time.sleep(delay)
+
+
+def _fetch(
+		url: str,
+		proxy: Optional[str],
+		stream: Optional[bool] = None,
+		session: Optional[Session] = None,
+		handle: Optional[AbortableRequest] = None,
+		on_start: Optional[Callable[[], None]] = None
+) -> str:
+	"""Perform one request through ``proxy`` and classify the result.
+	
+	Successful request latencies (excluding the politeness delay) are
+	recorded in ``latency_tracker``.
+	
+	Args:
+		handle: Lets another thread abort the request (see ``get_page_hedged``)
+		on_start: Called just before the request is sent
+	"""
+	owns_session = session is None
+	if owns_session:
+		session = create_session()
+	token = _current_request.set(handle)
 	
 	try:
-		# Proxy configuration
-		proxy = SCRAPER_PROXY if SCRAPER_PROXY else (get_random_proxy() if SCRAPER_USE_RANDOM_PROXIES else None)
 		proxies = {'http': proxy, 'https': proxy} if proxy else None
+		headers = build_headers(marketplace_for_url(url))
 		
-		# Headers
-		headers = {
-			"User-Agent": USER_AGENT,
-			"Accept-Language": "en-US,en;q=0.5",
-			'Host': AMAZON_DOMAIN,
-			'Origin': f'https://{AMAZON_DOMAIN}',
-			'Connection': 'keep-alive',
-			'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-			'Accept-Encoding': 'gzip, deflate, br',
-			'DNT': '1',
-			'Referer': f'https://{AMAZON_DOMAIN}/',
-			'Upgrade-Insecure-Requests': '1'
-		}
-		
-		# Add delay between requests to be nice to Amazon
-		if REQUEST_DELAY > 0:
-			jitter = REQUEST_DELAY * 0.5
-			delay = max(0.0, REQUEST_DELAY + random.uniform(-jitter, jitter))
-			logger.debug(f"Waiting {delay:.2f} seconds before request")
-			time.sleep(delay)
-		
-		logger.info(f"Fetching URL: {url}")
+		logger.info("Fetching URL: %s", url)
 		if proxies:
-			logger.debug(f"Using proxy: {proxies}")
+			logger.debug("Using proxy: %s", proxies)
 		
+		if stream is None:
+			stream = FETCH_STREAM
+		
+		if on_start is not None:
+			on_start()
+		started = time.monotonic()
 		response = session.get(
 			url,
 			headers=headers,
 			proxies=proxies,
-			timeout=REQUEST_TIMEOUT,
-			allow_redirects=True
+			timeout=run_budget.request_timeout(REQUEST_TIMEOUT),
+			allow_redirects=True,
+			stream=stream
 		)
-		response.raise_for_status()
 		
-		logger.debug(f"Successfully fetched {url} (Status: {response.status_code})")
-		return response.text
+		if stream:
+			try:
+				response.raise_for_status()
+				text = read_until_targets(response)
+			finally:
+				# Closing before the body is exhausted drops the connection early
+				response.close()
+		else:
+			response.raise_for_status()
+			text = response.text
+		latency_tracker.record(time.monotonic() - started)
+		
+		kind = classify_page(text)
+		proxy_stats.record(proxy, kind)
+		if kind in BLOCKED_KINDS:
+			raise BlockedPageError(url, proxy, kind)
+		if kind == PAGE_NOT_FOUND:
+			raise PageNotFoundError(url, proxy, kind)
+		
+		logger.debug("Successfully fetched %s (Status: %s)", url, response.status_code)
+		return text
 	
 	except Exception as e:
-		logger.error(f"Error fetching {url}: {str(e)}")
+		if handle is not None and handle.aborted.is_set():
+			logger.debug("Aborted %s, a hedged request won", url)
+			raise RequestAborted() from e
+		logger.error("Error fetching %s: %s", url, e)
 		raise
+	finally:
+		_current_request.reset(token)
+		if owns_session:
+			session.close()
+
+
+def get_page(
+		url: str,
+		stream: Optional[bool] = None,
+		exclude_proxies: Optional[Iterable[Optional[str]]] = None,
+		session: Optional[Session] = None
+) -> str:
+	"""
+	Fetch a web page with configurable settings.
+	
+	Args:
+		url: The URL to fetch
+		stream: Read the body incrementally and stop once the product fields
+			have been seen. Defaults to FETCH_STREAM from config.
+		exclude_proxies: Proxies to avoid when picking a random proxy, e.g.
+			ones that were just blocked for this URL
+		session: Long-lived session to reuse (keeps its connection pool warm).
+			If omitted, a new session is created and closed after the request.
+		
+	Returns:
+		str: The response text
+		
+	Raises:
+		BlockedPageError: If Amazon answered with a captcha/robot-check page
+		PageNotFoundError: If Amazon answered with its not-found page
+		requests.exceptions.RequestException: If the request fails
+	"""
+	proxy = _choose_proxy(exclude_proxies)
+	_polite_delay(marketplace_for_url(url))
+	return _fetch(url, proxy, stream, session)
+
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+	global _hedge_executor
+	with _hedge_executor_lock:
+		if _hedge_executor is None:
+			_hedge_executor = ThreadPoolExecutor(
+				max_workers=HEDGE_MAX_WORKERS,
+				thread_name_prefix='hedge'
+			)
+		return _hedge_executor
+
+
+class _HedgeRace:
+	"""Coordinates a primary request and its (optional) hedge."""
+	
+	def __init__(self, primary: AbortableRequest):
+		self._lock = threading.Lock()
+		self.primary = primary
+		self.started = threading.Event()
+		self.started_at: Optional[float] = None
+		self.primary_done = threading.Event()
+		self.hedge: Optional[AbortableRequest] = None
+		self.hedge_done = threading.Event()
+		self.hedge_text: Optional[str] = None
+		self.winner: Optional[str] = None
+	
+	def mark_started(self):
+		self.started_at = time.monotonic()
+		self.started.set()
+	
+	def begin_hedge(self, hedge: AbortableRequest) -> bool:
+		"""Register the hedge; False if the primary already finished."""
+		with self._lock:
+			if self.primary_done.is_set():
+				return False
+			self.hedge = hedge
+			return True
+	
+	def finish_hedge(self, text: Optional[str]) -> bool:
+		"""Record the hedge's outcome; True (and abort the primary) if it won."""
+		with self._lock:
+			won = text is not None and self.winner is None
+			if won:
+				self.winner = 'hedge'
+				self.hedge_text = text
+		self.hedge_done.set()
+		if won:
+			self.primary.abort()
+		return won
+	
+	def finish_primary(self, succeeded: bool):
+		"""Record the primary's outcome, aborting the hedge if the primary won."""
+		with self._lock:
+			self.primary_done.set()
+			self.started.set()
+			won = succeeded and self.winner is None
+			if won:
+				self.winner = 'primary'
+			hedge = self.hedge
+		if won and hedge is not None:
+			hedge.abort()
+	
+	def hedge_result(self) -> Optional[str]:
+		"""Wait for a hedge in flight and return its text if it succeeded."""
+		with self._lock:
+			hedge = self.hedge
+		if hedge is None:
+			return None
+		self.hedge_done.wait()
+		return self.hedge_text
+
+
+def _run_hedge(
+		race: _HedgeRace,
+		url: str,
+		threshold: float,
+		stream: Optional[bool],
+		exclude_proxies: tuple
+):
+	"""Send a hedge once the primary has been in flight for ``threshold`` seconds."""
+	race.started.wait()
+	if race.started_at is not None:
+		remaining = race.started_at + threshold - time.monotonic()
+		if race.primary_done.wait(max(0.0, remaining)):
+			return
+	if race.primary_done.is_set():
+		return
+	if not hedge_budget.try_acquire():
+		logger.debug("Hedge budget exhausted, waiting on %s", url)
+		return
+	
+	hedge = AbortableRequest()
+	if not race.begin_hedge(hedge):
+		return
+	hedge_proxy = _choose_proxy(exclude_proxies)
+	logger.info("Hedging %s after %.2fs via %s", url, threshold, proxy_label(hedge_proxy))
+	# Its own session, so a losing hedge never shares the marketplace's connections
+	session = create_session()
+	text = None
+	try:
+		text = _fetch(url, hedge_proxy, stream, session, handle=hedge)
+	except Exception:
+		pass
 	finally:
 		session.close()
+		if race.finish_hedge(text):
+			hedge_budget.record_win()
+
+
+def get_page_hedged(
+		url: str,
+		stream: Optional[bool] = None,
+		exclude_proxies: Optional[Iterable[Optional[str]]] = None,
+		session: Optional[Session] = None
+) -> str:
+	"""
+	Fetch a page like ``get_page``, hedging slow requests.
+	
+	The primary request runs on the calling thread. If it has not completed
+	within the HEDGE_PERCENTILE latency observed so far (timed from when it
+	was sent), a duplicate is sent through a different proxy on its own
+	session, and the first successful response wins; the loser's connection
+	is shut down. Hedges are limited by ``hedge_budget`` to HEDGE_BUDGET of
+	all requests, and are not sent until HEDGE_MIN_SAMPLES latencies have
+	been recorded.
+	
+	Args:
+		url: The URL to fetch
+		stream: See ``get_page``
+		exclude_proxies: See ``get_page``
+		session: Session for the primary request; the hedge uses its own
+		
+	Returns:
+		str: The response text
+		
+	Raises:
+		requests.exceptions.RequestException: If the primary request fails
+			(and the hedge, if one was sent, fails too)
+	"""
+	hedge_budget.record_request()
+	threshold = latency_tracker.percentile(HEDGE_PERCENTILE, min_samples=HEDGE_MIN_SAMPLES)
+	if threshold is None:
+		return get_page(url, stream, exclude_proxies, session)
+	
+	primary_proxy = _choose_proxy(exclude_proxies)
+	_polite_delay(marketplace_for_url(url))
+	race = _HedgeRace(AbortableRequest())
+	# The hedge keeps the caller's context so its log records carry the correlation id
+	_get_hedge_executor().submit(
+		contextvars.copy_context().run, _run_hedge,
+		race, url, threshold, stream, tuple(exclude_proxies or ()) + (primary_proxy,)
+	)
+	try:
+		text = _fetch(url, primary_proxy, stream, session, handle=race.primary, on_start=race.mark_started)
+	except Exception:
+		race.finish_primary(False)
+		hedge_text = race.hedge_result()
+		if hedge_text is not None:
+			return hedge_text
+		raise
+	race.finish_primary(True)
+	return text
@@ -0,0 +1,172 @@
+"""Centralized, non-blocking logging setup.
+
+Log records are put on an in-memory queue by the calling thread and written
+to LOG_FILE by a single background ``QueueListener`` thread, so workers never
+wait on file I/O or the file handler's lock. With LOG_FORMAT=json each record
+is one JSON object per line and carries the correlation id of the URL being
+processed.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+
+# Import configuration
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config import LOG_LEVEL, LOG_FILE, LOG_FORMAT, LOG_QUEUE
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_correlation_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('correlation_id', default=None)
+
+_setup_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+_installed: Optional[logging.Handler] = None
+_configured = False
+
+
+def get_correlation_id() -> Optional[str]:
+	return _correlation_id.get()
+
+
+def new_correlation_id() -> str:
+	return uuid.uuid4().hex[:12]
+
+
+@contextmanager
+def correlation_scope(correlation_id: Optional[str] = None) -> Iterator[str]:
+	"""Tag log records emitted inside the block with a correlation id."""
+	cid = correlation_id or new_correlation_id()
+	token = _correlation_id.set(cid)
+	try:
+		yield cid
+	finally:
+		_correlation_id.reset(token)
+
+
+class CorrelationIdFilter(logging.Filter):
+	"""Copy the current correlation id onto each record (in the emitting thread)."""
+
+	def filter(self, record: logging.LogRecord) -> bool:
+		record.correlation_id = _correlation_id.get()
+		return True
+
+
+class JsonLinesFormatter(logging.Formatter):
+	"""Format records as single-line JSON objects."""
+
+	def format(self, record: logging.LogRecord) -> str:
+		payload = {
+			'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+			'level': record.levelname,
+			'logger': record.name,
+			'message': record.getMessage(),
+			'thread': record.threadName,
+		}
+		correlation_id = getattr(record, 'correlation_id', None)
+		if correlation_id:
+			payload['correlation_id'] = correlation_id
+		if record.exc_info:
+			payload['exc_info'] = self.formatException(record.exc_info)
+		elif record.exc_text:
+			payload['exc_info'] = record.exc_text
+		return json.dumps(payload, ensure_ascii=False)
+
+
+class _InProcessQueueHandler(logging.handlers.QueueHandler):
+	"""QueueHandler that skips the defensive record copy and full format.
+	
+	The queue never leaves the process and the record has no other
+	handlers, so the emitting thread only renders the message and
+	traceback; timestamps and layout are formatted by the listener thread.
+	"""
+	
+	def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+		record.msg = record.getMessage()
+		record.args = None
+		if record.exc_info:
+			record.exc_text = _TRACEBACK_FORMATTER.formatException(record.exc_info)
+			record.exc_info = None
+		return record
+
+
+_TRACEBACK_FORMATTER = logging.Formatter()
+
+
+def _build_output_handler(log_file: Optional[str], log_format: str) -> logging.Handler:
+	handler: logging.Handler = logging.FileHandler(log_file) if log_file else logging.StreamHandler()
+	handler.setFormatter(JsonLinesFormatter() if log_format == 'json' else logging.Formatter(TEXT_FORMAT))
+	return handler
+
+
+def setup_logging(
+		level: str = LOG_LEVEL,
+		log_file: Optional[str] = LOG_FILE,
+		log_format: str = LOG_FORMAT,
+		use_queue: bool = LOG_QUEUE,
+		force: bool = False
+):
+	"""Configure the root logger once for the whole process.
+
+	Safe to call from every module; only the first call (or one with
+	``force=True``) changes the configuration. Like ``logging.basicConfig``,
+	nothing is added if the root logger already has handlers of its own.
+
+	Args:
+		level: Log level name
+		log_file: File to write to; stderr if empty
+		log_format: 'text' (the classic line format) or 'json' (JSON lines)
+		use_queue: Write through a QueueHandler/QueueListener pair
+		force: Replace an existing configuration (used by tests/benchmarks)
+	"""
+	global _configured, _listener, _installed
+	with _setup_lock:
+		if _configured and not force:
+			return
+		_configured = True
+
+		root = logging.getLogger()
+		if _installed is not None:
+			root.removeHandler(_installed)
+			_installed = None
+		shutdown_logging()
+		if root.handlers and not force:
+			return
+		root.setLevel(getattr(logging, level.upper(), logging.INFO))
+
+		output = _build_output_handler(log_file, log_format)
+		if use_queue:
+			log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+			front: logging.Handler = _InProcessQueueHandler(log_queue)
+			_listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+			_listener.start()
+		else:
+			front = output
+		front.addFilter(CorrelationIdFilter())
+		root.addHandler(front)
+		_installed = front
+
+
+def shutdown_logging():
+	"""Flush queued records and stop the background listener."""
+	global _listener
+	if _listener is not None:
+		_listener.stop()
+		for handler in _listener.handlers:
+			handler.close()
+		_listener = None
+	elif _installed is not None:
+		_installed.flush()
+
+
+atexit.register(shutdown_logging)
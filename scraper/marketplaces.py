@@ -0,0 +1,61 @@
+"""Per-marketplace (Amazon regional domain) settings derived from product URLs."""
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+# Import configuration
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config import AMAZON_DOMAIN, MARKETPLACE_REQUEST_DELAYS
+
+# Decimal separator used in displayed prices, keyed by registrable domain.
+# Marketplaces not listed here fall back to clean_price's format heuristics.
+DECIMAL_SEPARATORS: Dict[str, str] = {
+	'amazon.com': '.',
+	'amazon.ca': '.',
+	'amazon.co.uk': '.',
+	'amazon.com.au': '.',
+	'amazon.com.mx': '.',
+	'amazon.co.jp': '.',
+	'amazon.in': '.',
+	'amazon.sg': '.',
+	'amazon.ae': '.',
+	'amazon.sa': '.',
+	'amazon.eg': '.',
+	'amazon.de': ',',
+	'amazon.fr': ',',
+	'amazon.it': ',',
+	'amazon.es': ',',
+	'amazon.nl': ',',
+	'amazon.se': ',',
+	'amazon.pl': ',',
+	'amazon.com.be': ',',
+	'amazon.com.br': ',',
+	'amazon.com.tr': ',',
+}
+
+
+def marketplace_for_url(url: str) -> str:
+	"""Return the host a product URL belongs to, e.g. ``www.amazon.de``.
+
+	URLs without a host (relative or malformed) map to AMAZON_DOMAIN.
+	"""
+	host = urlparse(url).hostname
+	return host.lower() if host else AMAZON_DOMAIN
+
+
+def _registrable(domain: str) -> str:
+	return domain[4:] if domain.startswith('www.') else domain
+
+
+def decimal_separator(domain: str) -> Optional[str]:
+	"""Return the price decimal separator for a marketplace, if known."""
+	return DECIMAL_SEPARATORS.get(_registrable(domain))
+
+
+def request_delay(domain: str, default: float) -> float:
+	"""Return the politeness delay configured for a marketplace, else ``default``."""
+	if domain in MARKETPLACE_REQUEST_DELAYS:
+		return MARKETPLACE_REQUEST_DELAYS[domain]
+	return MARKETPLACE_REQUEST_DELAYS.get(_registrable(domain), default)
@@ -1,34 +1,12 @@
 from bs4 import BeautifulSoup
-import re
 from typing import Optional, Dict, Any
 
+from .prices import normalizer_for_separator, extract_currency
 
-def clean_price(text: Optional[str]) -> Optional[float]:
-	if not text:
-		return None
-	s = re.sub(r'[^\d.,]', '', text)
-	if not s:
-		return None
-	if ',' in s and '.' in s:
-		if s.rfind(',') > s.rfind('.'):
-			s = s.replace('.', '')
-			s = s.replace(',', '.')
-		else:
-			s = s.replace(',', '')
-	elif ',' in s:
-		if s.count(',') == 1 and len(s.split(',')[-1]) == 2:
-			s = s.replace(',', '.')
-		else:
-			s = s.replace(',', '')
-	elif '.' in s:
-		if s.count('.') == 1 and len(s.split('.')[-1]) == 2:
-			pass
-		else:
-			s = s.replace('.', '')
-	try:
-		return float(s)
-	except Exception:
-		return None
+
+def clean_price(text: Optional[str], decimal_sep: Optional[str] = None) -> Optional[float]:
+	"""Parse price text; guess the decimal separator unless ``decimal_sep`` is given."""
+	return normalizer_for_separator(decimal_sep).normalize(text)
 
 
 def _clean_category(breadcrumb: str) -> str:
@@ -36,7 +14,7 @@ def _clean_category(breadcrumb: str) -> str:
 	return ' > '.join(items)
 
 
-def parse_amazon_product(html: str) -> Dict[str, Any]:
+def parse_amazon_product(html: str, decimal_sep: Optional[str] = None) -> Dict[str, Any]:
 	soup = BeautifulSoup(html, 'lxml')
 	
 	title_el = soup.select_one('#productTitle')
@@ -44,7 +22,8 @@ def parse_amazon_product(html: str) -> Dict[str, Any]:
 	
 	price_el = soup.select_one('#corePrice_feature_div > div > div > span.a-price > span.a-offscreen')
 	price_text = price_el.get_text(strip=True) if price_el else None
-	price = clean_price(price_text)
+	price = clean_price(price_text, decimal_sep)
+	currency = extract_currency(price_text)
 	
 	category_el = soup.select_one("#wayfinding-breadcrumbs_feature_div > ul")
 	if category_el:
@@ -59,6 +38,8 @@ def parse_amazon_product(html: str) -> Dict[str, Any]:
 	return {
 		'title': title,
 		'price': price,
+		'price_raw': price_text,
+		'currency': currency,
 		'category': category,
 		'availability': availability
 	}
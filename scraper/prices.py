@@ -0,0 +1,95 @@
+"""Price text normalization.
+
+Raw ``a-offscreen`` price strings are stored alongside the parsed value, so a
+misparse can be corrected later by re-normalizing the stored text with the
+right marketplace locale (see ``Database.renormalize_prices``).
+"""
+import re
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+from .marketplaces import decimal_separator
+
+_NON_NUMERIC = re.compile(r'[^\d.,]')
+_CURRENCY = re.compile(r'[^\d.,\s]+')
+
+
+def _guess_price(s: str) -> Optional[float]:
+	"""Parse digits/separators whose decimal separator is unknown.
+
+	The separator is guessed from position and group length, so ``1.299``
+	reads as 1299 and ``12.99`` as 12.99.
+	"""
+	if not s:
+		return None
+	if ',' in s and '.' in s:
+		if s.rfind(',') > s.rfind('.'):
+			s = s.replace('.', '')
+			s = s.replace(',', '.')
+		else:
+			s = s.replace(',', '')
+	elif ',' in s:
+		if s.count(',') == 1 and len(s.split(',')[-1]) == 2:
+			s = s.replace(',', '.')
+		else:
+			s = s.replace(',', '')
+	elif '.' in s:
+		if s.count('.') == 1 and len(s.split('.')[-1]) == 2:
+			pass
+		else:
+			s = s.replace('.', '')
+	try:
+		return float(s)
+	except ValueError:
+		return None
+
+
+class PriceNormalizer:
+	"""Convert price text to floats for one decimal separator.
+
+	With a known separator every other character is grouping or currency
+	and is dropped with a single precompiled regex. Without one
+	(``decimal_sep=None``) the separator is guessed per value.
+	"""
+
+	def __init__(self, decimal_sep: Optional[str] = None):
+		self.decimal_sep = decimal_sep
+		if decimal_sep:
+			self._strip = re.compile(r'[^\d' + re.escape(decimal_sep) + ']')
+			self._to_dot = str.maketrans(decimal_sep, '.')
+
+	def normalize(self, text: Optional[str]) -> Optional[float]:
+		if not text:
+			return None
+		if not self.decimal_sep:
+			return _guess_price(_NON_NUMERIC.sub('', text))
+		s = self._strip.sub('', text)
+		if not s:
+			return None
+		try:
+			return float(s.translate(self._to_dot))
+		except ValueError:
+			return None
+
+	def normalize_batch(self, texts: Iterable[Optional[str]]) -> List[Optional[float]]:
+		"""Normalize many values in one pass (used for corrective backfills)."""
+		normalize = self.normalize
+		return [normalize(text) for text in texts]
+
+
+@lru_cache(maxsize=None)
+def normalizer_for_separator(decimal_sep: Optional[str]) -> PriceNormalizer:
+	return PriceNormalizer(decimal_sep)
+
+
+def normalizer_for_marketplace(domain: Optional[str]) -> PriceNormalizer:
+	"""Return the normalizer for a marketplace's locale (guessing if unknown)."""
+	return normalizer_for_separator(decimal_separator(domain) if domain else None)
+
+
+def extract_currency(text: Optional[str]) -> Optional[str]:
+	"""Return the currency symbol/code in a price string, e.g. ``$`` or ``€``."""
+	if not text:
+		return None
+	match = _CURRENCY.search(text)
+	return match.group(0) if match else None
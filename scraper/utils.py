@@ -1,4 +1,9 @@
+import math
 import random
+import threading
+from collections import defaultdict, deque
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlparse
 
 PROXIES = [
 	None, # 1 call with no proxy
@@ -7,5 +12,122 @@ PROXIES = [
 	'http://foo.com:3128'
 ]
 
-def get_random_proxy():
-	return random.choice(PROXIES)
\ No newline at end of file
+def get_random_proxy(exclude: Optional[Iterable[Optional[str]]] = None):
+	"""Pick a random proxy, avoiding ``exclude`` while alternatives remain."""
+	if exclude:
+		excluded = set(exclude)
+		candidates = [p for p in PROXIES if p not in excluded]
+		if candidates:
+			return random.choice(candidates)
+	return random.choice(PROXIES)
+
+
+def proxy_label(proxy: Optional[str]) -> str:
+	"""Return a log-safe name for a proxy (credentials stripped)."""
+	if not proxy:
+		return 'direct'
+	parsed = urlparse(proxy)
+	if parsed.hostname:
+		netloc = parsed.hostname + (f':{parsed.port}' if parsed.port else '')
+		return f'{parsed.scheme}://{netloc}'
+	return proxy
+
+
+class ProxyStats:
+	"""Thread-safe per-proxy counters of page kinds seen."""
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+	def record(self, proxy: Optional[str], kind: str):
+		with self._lock:
+			self._counts[proxy_label(proxy)][kind] += 1
+
+	def reset(self):
+		with self._lock:
+			self._counts.clear()
+
+	def snapshot(self) -> Dict[str, Dict[str, int]]:
+		with self._lock:
+			return {label: dict(kinds) for label, kinds in self._counts.items()}
+
+	def block_rates(self, blocked_kinds: Iterable[str]) -> Dict[str, float]:
+		"""Return the fraction of responses per proxy whose kind is in ``blocked_kinds``."""
+		blocked_kinds = set(blocked_kinds)
+		rates = {}
+		for label, kinds in self.snapshot().items():
+			total = sum(kinds.values())
+			blocked = sum(n for kind, n in kinds.items() if kind in blocked_kinds)
+			rates[label] = blocked / total if total else 0.0
+		return rates
+
+
+class LatencyTracker:
+	"""Thread-safe rolling window of request latencies (seconds)."""
+
+	def __init__(self, window: int = 1000):
+		self._lock = threading.Lock()
+		self._samples = deque(maxlen=window)
+
+	def record(self, seconds: float):
+		with self._lock:
+			self._samples.append(seconds)
+
+	def reset(self):
+		with self._lock:
+			self._samples.clear()
+
+	def __len__(self):
+		return len(self._samples)
+
+	def percentile(self, pct: float, min_samples: int = 1) -> Optional[float]:
+		"""Return the nearest-rank ``pct`` percentile, or None with too few samples."""
+		with self._lock:
+			samples = sorted(self._samples)
+		if not samples or len(samples) < min_samples:
+			return None
+		rank = max(0, min(len(samples) - 1, math.ceil(pct / 100.0 * len(samples)) - 1))
+		return samples[rank]
+
+	def summary(self) -> Dict[str, Optional[float]]:
+		return {
+			'count': len(self),
+			'p50': self.percentile(50),
+			'p95': self.percentile(95),
+			'p99': self.percentile(99),
+		}
+
+
+class HedgeBudget:
+	"""Allow hedged duplicates for at most ``ratio`` of requests."""
+
+	def __init__(self, ratio: float):
+		self._lock = threading.Lock()
+		self.ratio = ratio
+		self.requests = 0
+		self.hedges = 0
+		self.wins = 0
+
+	def record_request(self):
+		with self._lock:
+			self.requests += 1
+
+	def try_acquire(self) -> bool:
+		with self._lock:
+			if self.hedges + 1 > self.ratio * self.requests:
+				return False
+			self.hedges += 1
+			return True
+
+	def record_win(self):
+		with self._lock:
+			self.wins += 1
+
+	def reset(self):
+		with self._lock:
+			self.requests = self.hedges = self.wins = 0
+
+	def snapshot(self) -> Dict[str, int]:
+		with self._lock:
+			return {'hedge_eligible': self.requests, 'hedges': self.hedges, 'hedge_wins': self.wins}
@@ -0,0 +1,99 @@
+import time
+from datetime import datetime
+
+import pytest
+from urllib3.exceptions import MaxRetryError, ProtocolError
+from urllib3.response import HTTPResponse
+
+from scraper.budget import RunBudget, BudgetedRetry, parse_deadline, monotonic_deadline
+
+
+def test_retry_budget_is_shared_and_limited():
+	budget = RunBudget()
+	budget.start(max_retries=2)
+	assert budget.try_retry()
+	assert budget.try_retry()
+	assert not budget.try_retry()
+	assert budget.snapshot() == {'retries_used': 2, 'retries_denied': 1, 'deadline_reached': False}
+
+
+def test_no_retries_inside_deadline_margin():
+	budget = RunBudget()
+	budget.start(deadline=time.monotonic() + 30, margin=60)
+	assert budget.expired()
+	assert not budget.try_retry()
+	assert budget.request_timeout(30) == 1.0
+
+
+def test_request_timeout_capped_by_time_left():
+	budget = RunBudget()
+	assert budget.request_timeout(30) == 30
+	budget.start(deadline=time.monotonic() + 10)
+	assert budget.request_timeout(30) <= 10
+
+
+def test_budgeted_retry_stops_when_budget_spent():
+	budget = RunBudget()
+	budget.start(max_retries=1)
+	retry = BudgetedRetry(total=5, budget=budget)
+	retry = retry.increment(method='GET', url='/', error=ProtocolError('reset'))
+	assert retry.total == 4
+	assert retry.budget is budget
+	with pytest.raises(MaxRetryError):
+		retry.increment(method='GET', url='/', error=ProtocolError('reset'))
+
+
+def test_budget_charged_only_for_real_retries():
+	budget = RunBudget()
+	budget.start(max_retries=10)
+	retry = BudgetedRetry(total=1, budget=budget)
+	retry = retry.increment(method='GET', url='/', error=ProtocolError('reset'))
+	with pytest.raises(MaxRetryError):
+		retry.increment(method='GET', url='/', error=ProtocolError('reset'))
+	assert budget.snapshot()['retries_used'] == 1
+	assert budget.snapshot()['retries_denied'] == 0
+
+
+def test_retry_after_past_deadline_is_denied():
+	budget = RunBudget()
+	budget.start(deadline=time.monotonic() + 30)
+	retry = BudgetedRetry(total=5, status_forcelist=[503], budget=budget)
+	short = HTTPResponse(body=b'', status=503, headers={'Retry-After': '5'})
+	long = HTTPResponse(body=b'', status=503, headers={'Retry-After': '120'})
+	
+	retry = retry.increment(method='GET', url='/', response=short)
+	assert retry.get_retry_after(short) == 5
+	assert retry.get_retry_after(long) <= 30
+	with pytest.raises(MaxRetryError):
+		retry.increment(method='GET', url='/', response=long)
+	assert budget.snapshot()['retries_used'] == 1
+	assert budget.snapshot()['retries_denied'] == 1
+
+
+def test_backoff_past_deadline_is_denied():
+	budget = RunBudget()
+	budget.start(deadline=time.monotonic() + 5)
+	retry = BudgetedRetry(total=5, backoff_factor=4, budget=budget)
+	# urllib3 does not back off before the first retry, then waits 8s
+	retry = retry.increment(method='GET', url='/', error=ProtocolError('reset'))
+	assert retry.get_backoff_time() == 0
+	with pytest.raises(MaxRetryError):
+		retry.increment(method='GET', url='/', error=ProtocolError('reset'))
+	assert budget.snapshot()['retries_used'] == 1
+	assert budget.snapshot()['retries_denied'] == 1
+
+
+def test_parse_deadline():
+	now = datetime(2025, 1, 1, 9, 30)
+	assert parse_deadline('10:15', now) == datetime(2025, 1, 1, 10, 15)
+	assert parse_deadline('08:00', now) == datetime(2025, 1, 2, 8, 0)
+	assert parse_deadline('2025-01-03T07:00:00', now) == datetime(2025, 1, 3, 7, 0)
+	with pytest.raises(ValueError):
+		parse_deadline('soon', now)
+
+
+def test_monotonic_deadline_takes_earliest_limit():
+	assert monotonic_deadline() is None
+	start = time.monotonic()
+	deadline = monotonic_deadline(datetime.fromtimestamp(time.time() + 3600), max_duration=60)
+	assert start + 59 < deadline < start + 61
@@ -0,0 +1,38 @@
+import pytest
+
+from scraper.classifier import (
+	classify_page, PAGE_PRODUCT, PAGE_CAPTCHA, PAGE_ROBOT_CHECK,
+	PAGE_NOT_FOUND, PAGE_UNKNOWN, BLOCK_PAGE_MAX_SIZE
+)
+from scraper.utils import ProxyStats, proxy_label
+
+
+@pytest.mark.parametrize(
+	"html,expected",
+	[
+		("", PAGE_UNKNOWN),
+		('<html><span id="productTitle">Widget</span></html>', PAGE_PRODUCT),
+		('<form action="/errors/validateCaptcha"></form>', PAGE_CAPTCHA),
+		('<title>Robot Check</title><form action="/errors/validateCaptcha">', PAGE_ROBOT_CHECK),
+		("<p>Sorry! We couldn't find that page</p>", PAGE_NOT_FOUND),
+		("<html>Test Content</html>", PAGE_UNKNOWN),
+	]
+)
+def test_classify_page(html, expected):
+	assert classify_page(html) == expected
+
+
+def test_large_pages_skip_block_markers():
+	html = "<html>" + "x" * BLOCK_PAGE_MAX_SIZE + "Looking for something?</html>"
+	assert classify_page(html) == PAGE_UNKNOWN
+
+
+def test_proxy_stats_block_rates():
+	stats = ProxyStats()
+	stats.record(None, PAGE_PRODUCT)
+	stats.record('http://user:pw@p1.example:8000', PAGE_CAPTCHA)
+	stats.record('http://user:pw@p1.example:8000', PAGE_PRODUCT)
+	
+	rates = stats.block_rates({PAGE_CAPTCHA, PAGE_ROBOT_CHECK})
+	assert rates == {'direct': 0.0, 'http://p1.example:8000': 0.5}
+	assert 'pw' not in proxy_label('http://user:pw@p1.example:8000')
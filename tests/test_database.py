@@ -1,3 +1,5 @@
+import sqlite3
+
 import pytest
 
 from scraper.database import Database
@@ -42,3 +44,176 @@ def test_add_price_history_counts():
 	db.add_price_history(pid, 19.5)
 	cur.execute("SELECT COUNT(*) FROM price_history WHERE product_id=?", (pid,))
 	assert cur.fetchone()[0] == 2
+
+
+def test_add_price_history_keeps_raw_text():
+	db = Database('sqlite:///:memory:')
+	pid = db.ensure_product('https://www.amazon.de/dp/X', 'Title D', 1299.0)
+	db.add_price_history(pid, 1299.0, price_raw='1.299,00 €', currency='€', marketplace='www.amazon.de')
+
+	row = db.conn.execute("SELECT price_raw, currency, marketplace FROM price_history").fetchone()
+	assert tuple(row) == ('1.299,00 €', '€', 'www.amazon.de')
+
+
+def test_renormalize_prices_fixes_misparsed_rows():
+	db = Database('sqlite:///:memory:')
+	pid = db.ensure_product('https://www.amazon.com/dp/Y', 'Title E', 1299.0)
+	# '1.299' read with the guessing heuristic as 1299 on a '.'-decimal marketplace
+	db.add_price_history(pid, 1299.0, price_raw='$1.299', currency='$', marketplace='www.amazon.com')
+	db.add_price_history(pid, 12.5, price_raw='$12.50', currency='$', marketplace='www.amazon.com')
+	db.add_price_history(pid, 7.0)
+
+	assert db.renormalize_prices(batch_size=1) == 1
+	prices = [row['price'] for row in db.get_price_history(pid)]
+	assert prices == [1.299, 12.5, 7.0]
+	assert db.get_all_prices()[0]['last_price'] == 7.0
+
+
+def test_existing_price_history_table_is_migrated(tmp_path):
+	import sqlite3
+	path = tmp_path / 'old.db'
+	conn = sqlite3.connect(str(path))
+	conn.execute("CREATE TABLE price_history (id INTEGER PRIMARY KEY AUTOINCREMENT, product_id INTEGER, price REAL, checked_at TEXT)")
+	conn.commit()
+	conn.close()
+
+	db = Database(f'sqlite:///{path}')
+	columns = {row[1] for row in db.conn.execute("PRAGMA table_info(price_history)")}
+	assert {'price_raw', 'currency', 'marketplace'} <= columns
+
+
+def _insert_history(db, pid, price, checked_at):
+	db.conn.execute(
+		"INSERT INTO price_history (product_id, price, checked_at) VALUES (?, ?, ?)",
+		(pid, price, checked_at)
+	)
+	db.conn.commit()
+
+
+def test_rollups_maintained_on_insert():
+	db = Database('sqlite:///:memory:')
+	pid = db.ensure_product('https://example.com/p3', 'Title F', 10.0)
+	_insert_history(db, pid, 10.0, '2025-01-04T09:00:00+00:00')  # Saturday
+	_insert_history(db, pid, 14.0, '2025-01-04T18:00:00+00:00')
+	_insert_history(db, pid, 12.0, '2025-01-06T09:00:00+00:00')  # Monday, next week
+	_insert_history(db, pid, None, '2025-01-07T09:00:00+00:00')
+
+	daily = db.get_price_history(pid, resolution='daily')
+	assert [(r['bucket'], r['min_price'], r['max_price'], r['avg_price'], r['last_price'], r['samples'])
+			for r in daily] == [
+		('2025-01-04', 10.0, 14.0, 12.0, 14.0, 2),
+		('2025-01-06', 12.0, 12.0, 12.0, 12.0, 1),
+	]
+	assert [r['bucket'] for r in db.get_price_history(pid, resolution='weekly')] == ['2024-12-30', '2025-01-06']
+	monthly = db.get_price_history(resolution='monthly')
+	assert len(monthly) == 1
+	assert monthly[0]['last_price'] == 12.0
+	assert monthly[0]['samples'] == 3
+
+
+def test_rebuild_rollups_matches_incremental():
+	db = Database('sqlite:///:memory:')
+	pid = db.ensure_product('https://example.com/p4', 'Title G', 5.0)
+	for day, price in [(1, 5.0), (1, 7.0), (2, 6.0), (15, 4.0)]:
+		_insert_history(db, pid, price, f'2025-02-{day:02d}T12:00:00+00:00')
+
+	before = {res: [tuple(r) for r in db.get_price_history(resolution=res)] for res in ('daily', 'weekly', 'monthly')}
+	db.rebuild_rollups()
+	after = {res: [tuple(r) for r in db.get_price_history(resolution=res)] for res in ('daily', 'weekly', 'monthly')}
+	assert before == after
+
+
+def test_get_price_history_rejects_unknown_resolution():
+	db = Database('sqlite:///:memory:')
+	with pytest.raises(ValueError):
+		db.get_price_history(resolution='hourly')
+
+
+@pytest.fixture
+def archived_db(tmp_path, monkeypatch):
+	import scraper.database
+	monkeypatch.setattr(scraper.database, 'ARCHIVE_ATTACH_BATCH', 2)  # exercise batching
+	db = Database(f'sqlite:///{tmp_path}/prices.db')
+	pid = db.ensure_product('https://www.amazon.com/dp/Z', 'Title H', 4.0)
+	for month in range(1, 6):
+		db.conn.execute(
+			"INSERT INTO price_history (product_id, price, checked_at, price_raw, marketplace) VALUES (?, ?, ?, ?, ?)",
+			(pid, float(month), f'2024-{month:02d}-10T12:00:00+00:00', f'${month}.00', 'www.amazon.com')
+		)
+	db.conn.commit()
+	db.add_price_history(pid, 9.0)  # current month, stays hot
+	yield db, pid
+	db.close()
+
+
+def test_archive_moves_cold_months(archived_db):
+	db, pid = archived_db
+	rollups_before = [tuple(r) for r in db.get_price_history(resolution='monthly')]
+	history_before = [tuple(r) for r in db.get_price_history(pid)]
+
+	moved = db.archive_price_history(hot_months=1)
+	assert moved == {f'2024-{month:02d}': 1 for month in range(1, 6)}
+	assert db.conn.execute("SELECT COUNT(*) FROM price_history").fetchone()[0] == 1
+	assert len(list(db.archive_dir.glob('price_history_2024_*.db'))) == 5
+
+	# Reads union the hot table with the archives
+	assert [tuple(r) for r in db.get_price_history(pid)] == history_before
+	ranged = db.get_price_history(pid, start='2024-02-01', end='2024-04-01')
+	assert [r['price'] for r in ranged] == [2.0, 3.0]
+	assert [tuple(r) for r in db.get_price_history(resolution='monthly')] == rollups_before
+	db.rebuild_rollups()
+	assert [tuple(r) for r in db.get_price_history(resolution='monthly')] == rollups_before
+
+	# Archiving again is a no-op
+	assert db.archive_price_history(hot_months=1) == {}
+
+
+def test_renormalize_covers_archived_rows(archived_db):
+	db, pid = archived_db
+	db.archive_price_history(hot_months=1)
+	db.conn.execute("ATTACH DATABASE ? AS a", (str(db.archive_dir / 'price_history_2024_03.db'),))
+	db.conn.execute("UPDATE a.price_history SET price = 300.0")
+	db.conn.commit()
+	db.conn.execute("DETACH DATABASE a")
+
+	assert db.renormalize_prices() == 1
+	assert [r['price'] for r in db.get_price_history(pid, start='2024-03-01', end='2024-04-01')] == [3.0]
+	march = db.get_price_history(pid, resolution='monthly', start='2024-03-01', end='2024-04-01')
+	assert [r['max_price'] for r in march] == [3.0]
+
+
+def test_archive_needs_a_file_database():
+	with pytest.raises(ValueError):
+		Database('sqlite:///:memory:').archive_price_history()
+
+
+def test_archive_recovers_from_interrupted_move(archived_db):
+	db, pid = archived_db
+	db.archive_price_history(hot_months=1)
+	# Simulate a crash after the archive commit but before the delete from main
+	db.conn.execute(
+		"INSERT INTO price_history (id, product_id, price, checked_at) VALUES (1, ?, 1.0, '2024-01-10T12:00:00+00:00')",
+		(pid,)
+	)
+	db.conn.commit()
+
+	assert db.archive_price_history(hot_months=1) == {'2024-01': 1}
+	january = db.get_price_history(pid, start='2024-01-01', end='2024-02-01')
+	assert [r['price'] for r in january] == [1.0]
+
+
+def test_failed_rebuild_keeps_existing_rollups(archived_db, monkeypatch):
+	db, _ = archived_db
+	db.archive_price_history(hot_months=1)
+	before = [tuple(r) for r in db.get_price_history(resolution='daily')]
+
+	merge = Database._merge_rollup
+	def failing_merge(self, cur, resolution, schema, target):
+		if schema != 'main':
+			raise sqlite3.OperationalError('disk I/O error')
+		merge(self, cur, resolution, schema, target)
+	monkeypatch.setattr(Database, '_merge_rollup', failing_merge)
+
+	with pytest.raises(sqlite3.OperationalError):
+		db.rebuild_rollups()
+	assert [tuple(r) for r in db.get_price_history(resolution='daily')] == before
@@ -1,9 +1,18 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import pytest
 from unittest.mock import patch, MagicMock, call
 import requests
 from requests.exceptions import RequestException, Timeout, HTTPError
 
-from scraper.fetcher import create_session, get_page
+import scraper.fetcher
+from scraper.fetcher import (
+	create_session, get_page, get_page_hedged, read_until_targets, BlockedPageError,
+	AbortableRequest, RequestAborted
+)
+from scraper.utils import LatencyTracker, HedgeBudget
 
 
 class TestCreateSession:
@@ -108,3 +117,210 @@ class TestGetPage:
 			get_page("https://www.amazon.com/error")
 		
 		mock_session.close.assert_called_once()
+
+
+class TestStreamingFetch:
+	PAGE = (
+		b"<html><body>"
+		b"<span id='productTitle'>Widget</span>"
+		b"<div id='corePrice_feature_div'><span class='a-offscreen'>$9.99</span></div>"
+		b"<div id='availability'><span>In Stock</span></div>"
+		b"<div id='reviews'>" + b"x" * 5000 + b"</div>"
+		b"</body></html>"
+	)
+	
+	def _response(self, body, chunk_size=64):
+		response = MagicMock()
+		response.encoding = 'utf-8'
+		response.status_code = 200
+		chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+		consumed = []
+		
+		def iter_content(chunk_size=None):
+			for chunk in chunks:
+				consumed.append(chunk)
+				yield chunk
+		
+		response.iter_content.side_effect = iter_content
+		return response, consumed
+	
+	def test_stops_after_target_elements(self):
+		"""Reading stops once all target elements have closed."""
+		response, consumed = self._response(self.PAGE)
+		
+		html = read_until_targets(response)
+		
+		assert 'productTitle' in html
+		assert 'In Stock' in html
+		assert sum(len(c) for c in consumed) < len(self.PAGE)
+	
+	def test_respects_byte_cap(self):
+		"""Reading stops at the byte cap even if targets are missing."""
+		body = b"<html><body>" + b"<p>filler</p>" * 1000 + b"</body></html>"
+		response, consumed = self._response(body)
+		
+		read_until_targets(response, max_bytes=256)
+		
+		assert sum(len(c) for c in consumed) <= 256 + 64
+	
+	def test_get_page_stream_closes_response(self):
+		"""Streaming get_page returns the partial body and closes the response."""
+		response, _ = self._response(self.PAGE)
+		with patch('scraper.fetcher.create_session') as mock_create, patch('time.sleep'):
+			session = MagicMock()
+			session.get.return_value = response
+			mock_create.return_value = session
+			
+			html = get_page("https://www.amazon.com/test", stream=True)
+		
+		assert session.get.call_args[1]['stream'] is True
+		assert 'Widget' in html
+		response.close.assert_called_once()
+
+
+class TestBlockedPages:
+	@pytest.fixture(autouse=True)
+	def mock_time_sleep(self):
+		with patch('time.sleep'):
+			yield
+	
+	def _get(self, text, **kwargs):
+		with patch('scraper.fetcher.create_session') as mock_create:
+			session = MagicMock()
+			session.get.return_value.text = text
+			mock_create.return_value = session
+			return get_page("https://www.amazon.com/test", **kwargs), session
+	
+	def test_captcha_page_raises_blocked(self):
+		"""A 200 captcha page raises BlockedPageError with the proxy used."""
+		with pytest.raises(BlockedPageError) as exc_info:
+			self._get('<form action="/errors/validateCaptcha"></form>')
+		assert exc_info.value.kind == 'captcha'
+		assert isinstance(exc_info.value, RequestException)
+	
+	def test_exclude_proxies_passed_to_picker(self, monkeypatch):
+		"""Blocked proxies are excluded when picking the next one."""
+		monkeypatch.setattr('scraper.fetcher.SCRAPER_PROXY', None)
+		monkeypatch.setattr('scraper.fetcher.SCRAPER_USE_RANDOM_PROXIES', True)
+		picker = MagicMock(return_value='http://other:1')
+		monkeypatch.setattr('scraper.fetcher.get_random_proxy', picker)
+		
+		_, session = self._get("<html>ok</html>", exclude_proxies=('http://bad:1',))
+		
+		picker.assert_called_once_with(('http://bad:1',))
+		assert session.get.call_args[1]['proxies']['https'] == 'http://other:1'
+
+
+class TestHedgedFetch:
+	@pytest.fixture(autouse=True)
+	def setup(self, monkeypatch):
+		tracker = LatencyTracker()
+		for _ in range(20):
+			tracker.record(0.01)
+		monkeypatch.setattr('scraper.fetcher.latency_tracker', tracker)
+		monkeypatch.setattr('scraper.fetcher.hedge_budget', HedgeBudget(1.0))
+		monkeypatch.setattr('scraper.fetcher._polite_delay', lambda domain: None)
+		monkeypatch.setattr('scraper.fetcher.SCRAPER_PROXY', None)
+		monkeypatch.setattr('scraper.fetcher.SCRAPER_USE_RANDOM_PROXIES', True)
+		monkeypatch.setattr(
+			'scraper.fetcher.get_random_proxy',
+			lambda exclude=None: 'http://fast:1' if exclude else 'http://slow:1'
+		)
+		self.release = threading.Event()
+		yield
+		self.release.set()
+	
+	def _fake_fetch(self, url, proxy, stream=None, session=None, handle=None, on_start=None):
+		if on_start is not None:
+			on_start()
+		if proxy == 'http://slow:1':
+			deadline = time.monotonic() + 5
+			while not self.release.is_set() and time.monotonic() < deadline:
+				if handle is not None and handle.aborted.wait(0.01):
+					raise RequestAborted()
+			return 'slow'
+		return 'fast'
+	
+	def test_hedge_wins_over_slow_primary(self, monkeypatch):
+		"""A duplicate via another proxy is used when the primary is slow."""
+		monkeypatch.setattr('scraper.fetcher._fetch', self._fake_fetch)
+		
+		started = time.monotonic()
+		assert get_page_hedged("https://www.amazon.com/test") == 'fast'
+		# The slow primary was aborted rather than awaited
+		assert time.monotonic() - started < 2
+		assert scraper.fetcher.hedge_budget.snapshot()['hedge_wins'] == 1
+	
+	def test_primary_runs_on_calling_thread(self, monkeypatch):
+		"""Only hedges use the shared executor."""
+		threads = {}
+		
+		def fetch(url, proxy, stream=None, session=None, handle=None, on_start=None):
+			threads[proxy] = threading.current_thread()
+			return self._fake_fetch(url, proxy, stream, session, handle, on_start)
+		monkeypatch.setattr('scraper.fetcher._fetch', fetch)
+		
+		get_page_hedged("https://www.amazon.com/test")
+		assert threads['http://slow:1'] is threading.current_thread()
+		assert threads['http://fast:1'] is not threading.current_thread()
+	
+	def test_hedge_timer_starts_when_request_is_sent(self, monkeypatch):
+		"""Time before the primary is sent does not count towards the hedge threshold."""
+		tracker = LatencyTracker()
+		for _ in range(20):
+			tracker.record(0.2)
+		monkeypatch.setattr('scraper.fetcher.latency_tracker', tracker)
+		
+		def fetch(url, proxy, stream=None, session=None, handle=None, on_start=None):
+			time.sleep(0.3)  # e.g. waiting for a connection, before the request goes out
+			on_start()
+			return 'primary'
+		monkeypatch.setattr('scraper.fetcher._fetch', fetch)
+		
+		assert get_page_hedged("https://www.amazon.com/test") == 'primary'
+		assert scraper.fetcher.hedge_budget.snapshot()['hedges'] == 0
+	
+	def test_no_hedge_without_budget(self, monkeypatch):
+		"""With the budget exhausted the primary result is awaited."""
+		monkeypatch.setattr('scraper.fetcher._fetch', self._fake_fetch)
+		monkeypatch.setattr('scraper.fetcher.hedge_budget', HedgeBudget(0.0))
+		threading.Timer(0.1, self.release.set).start()
+		
+		assert get_page_hedged("https://www.amazon.com/test") == 'slow'
+	
+	def test_no_hedge_before_min_samples(self, monkeypatch):
+		"""Without enough latency samples the request is not hedged."""
+		monkeypatch.setattr('scraper.fetcher.latency_tracker', LatencyTracker())
+		fetch = MagicMock(return_value='plain')
+		monkeypatch.setattr('scraper.fetcher._fetch', fetch)
+		
+		assert get_page_hedged("https://www.amazon.com/test") == 'plain'
+		fetch.assert_called_once()
+
+
+class _SlowHandler(BaseHTTPRequestHandler):
+	def do_GET(self):
+		time.sleep(3)
+		self.send_response(200)
+		self.end_headers()
+	
+	def log_message(self, format, *args):
+		pass
+
+
+def test_abort_unblocks_in_flight_request():
+	"""AbortableRequest.abort() shuts the socket of a request waiting on its response."""
+	server = ThreadingHTTPServer(('127.0.0.1', 0), _SlowHandler)
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	session = create_session()
+	handle = AbortableRequest()
+	try:
+		threading.Timer(0.2, handle.abort).start()
+		started = time.monotonic()
+		with pytest.raises(RequestAborted):
+			scraper.fetcher._fetch(f'http://127.0.0.1:{server.server_port}/', None, session=session, handle=handle)
+		assert time.monotonic() - started < 2
+	finally:
+		session.close()
+		server.shutdown()
+		server.server_close()
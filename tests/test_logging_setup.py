@@ -0,0 +1,46 @@
+import json
+import logging
+
+import pytest
+
+from scraper import logging_setup
+from scraper.logging_setup import setup_logging, shutdown_logging, correlation_scope
+
+
+@pytest.fixture
+def restore_logging():
+	root = logging.getLogger()
+	handlers, level = list(root.handlers), root.level
+	yield
+	if logging_setup._installed is not None:
+		root.removeHandler(logging_setup._installed)
+		logging_setup._installed = None
+	shutdown_logging()
+	root.handlers[:] = handlers
+	root.setLevel(level)
+
+
+def test_json_lines_through_queue_with_correlation_id(tmp_path, restore_logging):
+	log_file = tmp_path / 'scraper.log'
+	setup_logging('INFO', str(log_file), 'json', use_queue=True, force=True)
+	logger = logging.getLogger('tests.logging')
+
+	with correlation_scope('abc123'):
+		logger.info("Fetching URL: %s", 'https://www.amazon.com/dp/X')
+	logger.debug("Filtered out: %s", 'lazy')
+	shutdown_logging()  # drains the queue
+
+	records = [json.loads(line) for line in log_file.read_text().splitlines()]
+	assert len(records) == 1
+	assert records[0]['message'] == 'Fetching URL: https://www.amazon.com/dp/X'
+	assert records[0]['correlation_id'] == 'abc123'
+	assert records[0]['level'] == 'INFO'
+
+
+def test_text_format_without_queue(tmp_path, restore_logging):
+	log_file = tmp_path / 'scraper.log'
+	setup_logging('INFO', str(log_file), 'text', use_queue=False, force=True)
+	logging.getLogger('tests.logging').warning("Missing data for %s", 'u')
+	shutdown_logging()
+
+	assert ' - tests.logging - WARNING - Missing data for u' in log_file.read_text()
@@ -0,0 +1,35 @@
+import pytest
+
+from scraper.fetcher import build_headers
+from scraper.marketplaces import marketplace_for_url, decimal_separator, request_delay
+
+
+@pytest.mark.parametrize(
+	"url,expected",
+	[
+		("https://www.amazon.de/dp/B0TEST", "www.amazon.de"),
+		("https://WWW.Amazon.co.jp/dp/B0TEST", "www.amazon.co.jp"),
+		("/dp/B0TEST", "www.amazon.com"),
+	]
+)
+def test_marketplace_for_url(url, expected):
+	assert marketplace_for_url(url) == expected
+
+
+def test_decimal_separator():
+	assert decimal_separator("www.amazon.de") == ","
+	assert decimal_separator("www.amazon.co.jp") == "."
+	assert decimal_separator("www.example.com") is None
+
+
+def test_request_delay_override(monkeypatch):
+	monkeypatch.setattr('scraper.marketplaces.MARKETPLACE_REQUEST_DELAYS', {'amazon.de': 3.0})
+	assert request_delay("www.amazon.de", 1.0) == 3.0
+	assert request_delay("www.amazon.fr", 1.0) == 1.0
+
+
+def test_headers_follow_marketplace():
+	headers = build_headers(marketplace_for_url("https://www.amazon.de/dp/B0TEST"))
+	assert headers['Host'] == 'www.amazon.de'
+	assert headers['Origin'] == 'https://www.amazon.de'
+	assert headers['Referer'] == 'https://www.amazon.de/'
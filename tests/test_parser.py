@@ -21,3 +21,18 @@ from scraper.parser import clean_price
 )
 def test_clean_price_formats(raw, expected):
 	assert clean_price(raw) == expected
+
+
+@pytest.mark.parametrize(
+	"raw,decimal_sep,expected",
+	[
+		("1.299,00 €", ",", 1299.0),
+		("1.299", ",", 1299.0),
+		("1.299", ".", 1.299),
+		("￥1,299", ".", 1299.0),
+		("$1,234.56", ".", 1234.56),
+		("N/A", ",", None),
+	]
+)
+def test_clean_price_with_decimal_separator(raw, decimal_sep, expected):
+	assert clean_price(raw, decimal_sep) == expected
@@ -0,0 +1,25 @@
+import pytest
+
+from scraper.prices import PriceNormalizer, normalizer_for_marketplace, extract_currency
+
+
+def test_normalize_batch_matches_single():
+	normalizer = PriceNormalizer(',')
+	texts = ['1.299,00 €', '19,99 €', None, 'N/A']
+	assert normalizer.normalize_batch(texts) == [1299.0, 19.99, None, None]
+	assert normalizer.normalize_batch(texts) == [normalizer.normalize(t) for t in texts]
+
+
+def test_normalizer_for_marketplace():
+	assert normalizer_for_marketplace('www.amazon.de').decimal_sep == ','
+	assert normalizer_for_marketplace('www.amazon.co.uk').decimal_sep == '.'
+	assert normalizer_for_marketplace(None).decimal_sep is None
+	assert normalizer_for_marketplace('www.amazon.de') is normalizer_for_marketplace('amazon.de')
+
+
+@pytest.mark.parametrize(
+	"raw,expected",
+	[("$1,234.56", "$"), ("1.299,00 €", "€"), ("CDN$ 19.99", "CDN$"), ("19,99", None), (None, None)]
+)
+def test_extract_currency(raw, expected):
+	assert extract_currency(raw) == expected
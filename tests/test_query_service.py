@@ -0,0 +1,117 @@
+import json
+import threading
+from urllib.request import urlopen
+from urllib.error import HTTPError
+
+import pytest
+
+from reports.query_service import TTLCache, PriceQueryService, create_server
+from scraper.database import Database
+
+
+def test_ttl_cache_lru_and_expiry(monkeypatch):
+	now = [100.0]
+	monkeypatch.setattr('reports.query_service.time.monotonic', lambda: now[0])
+	cache = TTLCache(maxsize=2, ttl=10)
+	cache.put('a', 1)
+	cache.put('b', 2)
+	assert cache.get('a') == 1
+	cache.put('c', 3)  # evicts least recently used 'b'
+	assert cache.get('b') is None
+	now[0] += 11
+	assert cache.get('a') is None
+
+
+@pytest.fixture
+def populated_db(tmp_path):
+	db_url = f'sqlite:///{tmp_path}/prices.db'
+	db = Database(db_url)
+	pid = db.ensure_product('https://www.amazon.com/dp/A', 'Widget', 10.0)
+	for day, price in [(1, 10.0), (9, 8.0)]:
+		db.conn.execute(
+			"INSERT INTO price_history (product_id, price, checked_at) VALUES (?, ?, ?)",
+			(pid, price, f'2025-03-{day:02d}T12:00:00+00:00')
+		)
+	db.conn.commit()
+	db.record_scrape_run(1)
+	yield db_url, db, pid
+	db.close()
+
+
+def test_service_caches_until_next_scrape_run(populated_db):
+	db_url, db, pid = populated_db
+	service = PriceQueryService(db_url, pool_size=2)
+	try:
+		assert [r['title'] for r in service.latest_prices()] == ['Widget']
+		db.ensure_product('https://www.amazon.com/dp/B', 'Gadget', 5.0)
+		# Still served from cache: no scrape run recorded since
+		assert len(service.latest_prices()) == 1
+		db.record_scrape_run(2)
+		assert len(service.latest_prices()) == 2
+
+		movers = service.top_movers(days=7)
+		assert movers[0]['product_id'] == pid
+		assert movers[0]['change'] == pytest.approx(-0.2)
+	finally:
+		service.close()
+
+
+def test_query_racing_a_scrape_run_is_not_cached(populated_db):
+	db_url, db, _ = populated_db
+	service = PriceQueryService(db_url, pool_size=2)
+	calls = []
+
+	def racing_query(conn):
+		calls.append(1)
+		if len(calls) == 1:
+			# A run finishes and another request clears the cache mid-query
+			db.record_scrape_run(2)
+			service.latest_prices()
+		return []
+
+	try:
+		service._cached(('race',), racing_query)
+		service._cached(('race',), racing_query)
+		assert len(calls) == 2
+		service._cached(('race',), racing_query)
+		assert len(calls) == 2
+	finally:
+		service.close()
+
+
+def test_http_endpoints(populated_db):
+	db_url, _, pid = populated_db
+	service = PriceQueryService(db_url, pool_size=2)
+	server = create_server(service, '127.0.0.1', 0)
+	thread = threading.Thread(target=server.serve_forever, daemon=True)
+	thread.start()
+	base = f'http://127.0.0.1:{server.server_port}'
+	try:
+		with urlopen(f'{base}/products/{pid}/history?resolution=daily') as response:
+			rows = json.load(response)
+		assert [r['bucket'] for r in rows] == ['2025-03-01', '2025-03-09']
+
+		with pytest.raises(HTTPError) as exc_info:
+			urlopen(f'{base}/products/{pid}/history?resolution=hourly')
+		assert exc_info.value.code == 400
+
+		with pytest.raises(HTTPError) as exc_info:
+			urlopen(f'{base}/nope')
+		assert exc_info.value.code == 404
+	finally:
+		server.shutdown()
+		server.server_close()
+		service.close()
+
+
+def test_history_includes_archived_months(populated_db):
+	db_url, db, pid = populated_db
+	db.add_price_history(pid, 9.0)
+	db.archive_price_history(hot_months=1)
+	service = PriceQueryService(db_url, pool_size=1)
+	try:
+		assert [r['price'] for r in service.price_history(pid)] == [10.0, 8.0, 9.0]
+		march = service.price_history(pid, start='2025-03-05', end='2025-04-01')
+		assert [r['price'] for r in march] == [8.0]
+	finally:
+		service.close()
@@ -0,0 +1,158 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+import runners.run_once as run_once
+from runners.run_once import load_products, order_urls, scrape_urls, _scrape_marketplace
+from scraper.classifier import PAGE_CAPTCHA
+from scraper.database import Database
+from scraper.fetcher import BlockedPageError, SessionPool, run_budget
+
+
+def _product_page(title, price):
+	return (
+		f'<span id="productTitle">{title}</span>'
+		f'<div id="corePrice_feature_div"><div><div><span class="a-price">'
+		f'<span class="a-offscreen">{price}</span></span></div></div></div>'
+	)
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+	monkeypatch.setattr(run_once, 'HEDGE_REQUESTS', False)
+	db = Database(f'sqlite:///{tmp_path}/prices.db')
+	yield db
+	db.close()
+
+
+def test_load_products_reads_optional_priority(tmp_path):
+	products_file = tmp_path / 'products.txt'
+	products_file.write_text('https://a\n\nhttps://b 5\nhttps://c high\n')
+	assert load_products(str(products_file)) == {'https://a': 0, 'https://b': 5, 'https://c': 0}
+
+
+def test_order_urls_by_priority_then_staleness():
+	last_checked = {
+		'https://fresh': '2025-01-02T00:00:00+00:00',
+		'https://stale': '2025-01-01T00:00:00+00:00',
+	}
+	urls = ['https://fresh', 'https://stale', 'https://new', 'https://vip']
+	ordered = order_urls(urls, last_checked, {'https://vip': 1})
+	assert ordered == ['https://vip', 'https://new', 'https://stale', 'https://fresh']
+
+
+def test_blocked_urls_are_requeued_on_other_proxies(db, monkeypatch):
+	monkeypatch.setattr(run_once, 'BLOCK_BACKOFF', 0.05)
+	monkeypatch.setattr(run_once, 'BLOCK_MAX_REQUEUES', 2)
+	run_budget.start()
+	attempts = []
+
+	def fake_get_page(url, exclude_proxies=None, session=None):
+		attempts.append((url, tuple(exclude_proxies), time.monotonic()))
+		if url == 'https://b':
+			blocked = sum(1 for attempt in attempts if attempt[0] == url)
+			raise BlockedPageError(url, f'http://p{blocked}.example:8000', PAGE_CAPTCHA)
+		return _product_page(url, '$1.00')
+
+	monkeypatch.setattr(run_once, 'get_page', fake_get_page)
+	stats = _scrape_marketplace('www.amazon.com', ['https://a', 'https://b', 'https://c'], db, session=None)
+
+	assert [attempt[0] for attempt in attempts] == ['https://a', 'https://b', 'https://c', 'https://b', 'https://b']
+	retries = [attempt for attempt in attempts if attempt[0] == 'https://b']
+	assert [attempt[1] for attempt in retries] == [
+		(),
+		('http://p1.example:8000',),
+		('http://p1.example:8000', 'http://p2.example:8000'),
+	]
+	# Backoff doubles per attempt: BLOCK_BACKOFF, then 2 * BLOCK_BACKOFF
+	assert retries[1][2] - retries[0][2] >= 0.05
+	assert retries[2][2] - retries[1][2] >= 0.1
+	assert stats == {'blocked': 3, 'gave_up': 1, 'failed': 0, 'skipped': 0}
+
+
+MIXED_MARKETPLACE_PAGES = {
+	'https://www.amazon.de/dp/A': '1.299,00 €',
+	'https://www.amazon.co.jp/dp/B': '￥1.299',
+	'https://www.amazon.de/dp/C': '24,99 €',
+	'https://www.amazon.co.jp/dp/D': '￥2,480',
+}
+
+
+def test_marketplaces_scraped_in_parallel_with_own_sessions(db, monkeypatch):
+	both_started = threading.Barrier(2, timeout=5)
+	fetches = []
+
+	def fake_get_page(url, exclude_proxies=None, session=None):
+		if url in ('https://www.amazon.de/dp/A', 'https://www.amazon.co.jp/dp/B'):
+			# Each marketplace's first URL waits for the other: they run concurrently
+			both_started.wait()
+		fetches.append((url, threading.current_thread().name, session))
+		return _product_page(url, MIXED_MARKETPLACE_PAGES[url])
+
+	monkeypatch.setattr(run_once, 'get_page', fake_get_page)
+	sessions = SessionPool()
+	try:
+		stats = scrape_urls(list(MIXED_MARKETPLACE_PAGES), db, sessions=sessions, retry_budget=None)
+		threads = {}
+		used_sessions = {}
+		for url, thread_name, session in fetches:
+			domain = url.split('/')[2]
+			threads.setdefault(domain, set()).add(thread_name)
+			used_sessions.setdefault(domain, set()).add(session)
+		# One worker per marketplace, each reusing that marketplace's session
+		assert all(len(names) == 1 for names in threads.values())
+		assert threads['www.amazon.de'] != threads['www.amazon.co.jp']
+		assert used_sessions == {
+			'www.amazon.de': {sessions.get('www.amazon.de')},
+			'www.amazon.co.jp': {sessions.get('www.amazon.co.jp')},
+		}
+	finally:
+		sessions.close()
+	assert stats['marketplaces'] == 2
+
+	rows = db.conn.execute(
+		"SELECT p.url, h.price, h.marketplace FROM price_history h JOIN products p ON p.id = h.product_id"
+	).fetchall()
+	assert {row[0]: (row[1], row[2]) for row in rows} == {
+		'https://www.amazon.de/dp/A': (1299.0, 'www.amazon.de'),
+		'https://www.amazon.co.jp/dp/B': (1.299, 'www.amazon.co.jp'),
+		'https://www.amazon.de/dp/C': (24.99, 'www.amazon.de'),
+		'https://www.amazon.co.jp/dp/D': (2480.0, 'www.amazon.co.jp'),
+	}
+
+
+def test_marketplace_workers_are_capped(db, monkeypatch):
+	monkeypatch.setattr(run_once, 'MARKETPLACE_MAX_WORKERS', 1)
+	threads = set()
+
+	def fake_get_page(url, exclude_proxies=None, session=None):
+		threads.add(threading.current_thread().name)
+		return _product_page(url, MIXED_MARKETPLACE_PAGES[url])
+
+	monkeypatch.setattr(run_once, 'get_page', fake_get_page)
+	assert scrape_urls(list(MIXED_MARKETPLACE_PAGES), db, retry_budget=None)['marketplaces'] == 2
+	assert len(threads) == 1
+
+
+def test_run_stops_at_deadline_and_still_exports(db, tmp_path, monkeypatch):
+	monkeypatch.setattr(run_once, 'REPORTS_DIR', str(tmp_path / 'reports'))
+	fetched = []
+
+	def slow_get_page(url, exclude_proxies=None, session=None):
+		fetched.append(url)
+		time.sleep(0.2)
+		return _product_page(url, '$5.00')
+
+	monkeypatch.setattr(run_once, 'get_page', slow_get_page)
+	urls = [f'https://www.amazon.com/dp/{i}' for i in range(10)]
+	started = time.monotonic()
+	summary = run_once.run_once(verbose=False, db=db, urls=urls, max_duration=1.5)
+
+	assert time.monotonic() - started < 1.5
+	assert 0 < len(fetched) < len(urls)
+	assert summary['skipped'] == len(urls) - len(fetched)
+	assert summary['deadline_reached'] is True
+	assert summary['exported_rows'] == len(fetched)
+	assert Path(summary['csv_path']).exists()
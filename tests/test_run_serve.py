@@ -0,0 +1,147 @@
+import os
+import threading
+
+import pytest
+
+import runners.run_once as run_once_module
+import runners.run_serve as run_serve
+from runners.run_once import load_products
+from runners.run_serve import ProductsWatcher, serve
+from scraper.database import Database
+from tests.test_run_once import _product_page
+
+
+@pytest.fixture
+def products_file(tmp_path):
+	path = tmp_path / 'products.txt'
+	path.write_text('https://a\nhttps://b 5\n')
+	return path
+
+
+@pytest.fixture
+def serve_env(tmp_path, products_file, monkeypatch):
+	"""Point serve at a temporary database/products file and record run_once calls."""
+	monkeypatch.setattr(run_serve, 'Database', lambda: Database(f'sqlite:///{tmp_path}/prices.db'))
+	monkeypatch.setattr(run_serve, 'resolve_products_file', lambda: products_file)
+	calls = []
+
+	def use(fake_run_once):
+		def recorder(**kwargs):
+			calls.append(kwargs)
+			return fake_run_once(**kwargs)
+		monkeypatch.setattr(run_serve, 'run_once', recorder)
+		return calls
+
+	return use
+
+
+def _run_in_thread(**kwargs):
+	result = {}
+	thread = threading.Thread(target=lambda: result.update(cycles=serve(**kwargs)), daemon=True)
+	thread.start()
+	thread.join(timeout=10)
+	assert not thread.is_alive(), "serve did not exit"
+	return result['cycles']
+
+
+def _touch(path, content):
+	stat = os.stat(path)
+	path.write_text(content)
+	# Make sure the change is visible even on filesystems with coarse mtimes
+	os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_watcher_reloads_only_when_file_changes(products_file, monkeypatch):
+	loads = []
+
+	def counting_load(path):
+		loads.append(path)
+		return load_products(path)
+
+	monkeypatch.setattr(run_serve, 'load_products', counting_load)
+	watcher = ProductsWatcher(products_file)
+	assert watcher.products() == {'https://a': 0, 'https://b': 5}
+	assert watcher.urls() == ['https://a', 'https://b']
+	assert len(loads) == 1
+
+	_touch(products_file, 'https://c\n')
+	assert watcher.products() == {'https://c': 0}
+	assert watcher.products() == {'https://c': 0}
+	assert len(loads) == 2
+
+
+def test_watcher_keeps_previous_list_when_reload_fails(products_file, monkeypatch):
+	watcher = ProductsWatcher(products_file)
+	assert watcher.urls() == ['https://a', 'https://b']
+
+	def broken_load(path):
+		raise UnicodeDecodeError('utf-8', b'\xff', 0, 1, 'invalid start byte')
+
+	monkeypatch.setattr(run_serve, 'load_products', broken_load)
+	_touch(products_file, 'https://c\n')
+	assert watcher.urls() == ['https://a', 'https://b']
+
+	products_file.unlink()
+	assert watcher.urls() == ['https://a', 'https://b']
+
+
+def test_stop_during_cycle_drains_and_exits(serve_env):
+	stop_event = threading.Event()
+
+	def stopped_mid_cycle(**kwargs):
+		# A signal arrives while URLs are in flight; run_once sees the same event
+		kwargs['stop_event'].set()
+		return {'exported_rows': 3}
+
+	calls = serve_env(stopped_mid_cycle)
+	assert _run_in_thread(interval=3600, stop_event=stop_event) == 1
+	assert len(calls) == 1
+	assert calls[0]['stop_event'] is stop_event
+	assert calls[0]['priorities'] == {'https://a': 0, 'https://b': 5}
+
+
+def test_failing_cycle_does_not_stop_the_loop(serve_env):
+	stop_event = threading.Event()
+
+	def flaky(**kwargs):
+		if len(calls) == 1:
+			raise RuntimeError('database is locked')
+		if len(calls) == 3:
+			stop_event.set()
+		return {'exported_rows': 1}
+
+	calls = serve_env(flaky)
+	assert _run_in_thread(interval=0.01, stop_event=stop_event) == 2
+	assert len(calls) == 3
+
+
+def test_short_interval_cycle_still_scrapes(tmp_path, products_file, monkeypatch):
+	# Real run_once/scrape_urls path: a 30s interval is shorter than the
+	# default 60s deadline margin, which must not leave the cycle no time
+	db_url = f'sqlite:///{tmp_path}/prices.db'
+	monkeypatch.setattr(run_serve, 'Database', lambda: Database(db_url))
+	monkeypatch.setattr(run_serve, 'resolve_products_file', lambda: products_file)
+	monkeypatch.setattr(run_once_module, 'REPORTS_DIR', str(tmp_path / 'reports'))
+	monkeypatch.setattr(run_once_module, 'RUN_DEADLINE_MARGIN', 60.0)
+	monkeypatch.setattr(run_once_module, 'HEDGE_REQUESTS', False)
+	stop_event = threading.Event()
+	fetched = []
+
+	def fake_get_page(url, exclude_proxies=None, session=None):
+		fetched.append(url)
+		if len(fetched) == 2:
+			stop_event.set()
+		return _product_page(url, '$10.00')
+
+	monkeypatch.setattr(run_once_module, 'get_page', fake_get_page)
+	try:
+		assert _run_in_thread(interval=30, stop_event=stop_event) == 1
+	finally:
+		stop_event.set()
+	assert sorted(fetched) == ['https://a', 'https://b']
+	db = Database(db_url)
+	try:
+		assert db.conn.execute("SELECT count(*) FROM price_history").fetchone()[0] == 2
+	finally:
+		db.close()
+	assert len(list((tmp_path / 'reports').iterdir())) == 1
@@ -0,0 +1,38 @@
+from datetime import datetime
+
+import pytest
+
+from runners.scheduler import CronSchedule, IntervalSchedule, parse_schedule
+
+
+def test_interval_schedule():
+	start = datetime(2025, 1, 1, 9, 0)
+	assert IntervalSchedule(3600).next_run(start) == datetime(2025, 1, 1, 10, 0)
+
+
+@pytest.mark.parametrize(
+	"expression,after,expected",
+	[
+		("0 9 * * *", datetime(2025, 1, 1, 8, 59), datetime(2025, 1, 1, 9, 0)),
+		("0 9 * * *", datetime(2025, 1, 1, 9, 0), datetime(2025, 1, 2, 9, 0)),
+		("*/15 * * * *", datetime(2025, 1, 1, 9, 1), datetime(2025, 1, 1, 9, 15)),
+		("30 6 * * 1", datetime(2025, 1, 1, 0, 0), datetime(2025, 1, 6, 6, 30)),  # next Monday
+		("0 0 1 3 *", datetime(2025, 12, 31, 0, 0), datetime(2026, 3, 1, 0, 0)),
+		("0 12 1-2,15 * *", datetime(2025, 1, 2, 13, 0), datetime(2025, 1, 15, 12, 0)),
+	]
+)
+def test_cron_next_run(expression, after, expected):
+	assert CronSchedule(expression).next_run(after) == expected
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "*/0 * * * *"])
+def test_cron_invalid(expression):
+	with pytest.raises(ValueError):
+		CronSchedule(expression)
+
+
+def test_parse_schedule_prefers_cron():
+	assert isinstance(parse_schedule(60, "0 9 * * *"), CronSchedule)
+	assert isinstance(parse_schedule(60, None), IntervalSchedule)
+	with pytest.raises(ValueError):
+		parse_schedule(None, None)
@@ -0,0 +1,27 @@
+from scraper.utils import LatencyTracker, HedgeBudget, get_random_proxy
+
+
+def test_get_random_proxy_excludes():
+	for _ in range(20):
+		assert get_random_proxy(exclude=[None, 'http://test.com:8000', 'http://foo.com:3128']) == 'http://example.com:8080'
+
+
+def test_latency_tracker_percentiles():
+	tracker = LatencyTracker(window=100)
+	assert tracker.percentile(95) is None
+	for i in range(1, 101):
+		tracker.record(float(i))
+	assert tracker.percentile(50) == 50.0
+	assert tracker.percentile(95) == 95.0
+	assert tracker.percentile(99) == 99.0
+	assert tracker.percentile(95, min_samples=101) is None
+
+
+def test_hedge_budget_limits_ratio():
+	budget = HedgeBudget(0.1)
+	for _ in range(20):
+		budget.record_request()
+	assert budget.try_acquire()
+	assert budget.try_acquire()
+	assert not budget.try_acquire()
+	assert budget.snapshot()['hedges'] == 2